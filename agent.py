@@ -1,19 +1,18 @@
-import os
 import time
+_started = time.perf_counter()
+
+import argparse
+import asyncio
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, END
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
-from rich.live import Live
-from rich.spinner import Spinner
 from rich.prompt import Prompt
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-import asyncio
+from rich.table import Table
 from ascii_art import display_welcome_message
 from config_manager import get_llm_config
-from llm_components.shared import get_llm, sync_structured_search, AgentState
-from llm_components.graph_nodes import search_node, analyze_node, decide_node, respond_node, initial_response_node
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,146 +20,223 @@ load_dotenv()
 # Initialize Rich console for better formatting
 console = Console()
 
-async def initialize_config():
-    return await get_llm_config()
-
-# Get LLM configuration
-config = asyncio.run(initialize_config())
-
-# Initialize LLM
-llm = get_llm(config)
-
-# Create the graph
-workflow = StateGraph(AgentState)
-
-# Add nodes
-workflow.add_node("initial_response", lambda state: initial_response_node(state, llm))
-workflow.add_node("search", lambda state: search_node(state, llm))
-workflow.add_node("analyze", lambda state: analyze_node(state, llm))
-workflow.add_node("decide", lambda state: decide_node(state, llm))
-workflow.add_node("respond", lambda state: respond_node(state, llm))
-
-# Add edges
-workflow.add_conditional_edges(
-    "initial_response",
-    lambda x: x["decision"],
-    {
-        "search": "search",
-        "respond": "respond"
-    }
-)
-workflow.add_edge("search", "analyze")
-workflow.add_edge("analyze", "decide")
-workflow.add_conditional_edges(
-    "decide",
-    lambda x: x["decision"],
-    {
-        "search": "search",
-        "respond": "respond"
-    }
-)
-workflow.add_edge("respond", END)
-
-# Set entry point
-workflow.set_entry_point("initial_response")
-
-# Compile the graph
-graph = workflow.compile()
+# Seconds from process start until the prompt is shown, checked by --startup-check
+STARTUP_BUDGET_SECONDS = 1.0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI-powered terminal agent with web search.")
+    parser.add_argument("--no-splash", action="store_true", help="Skip the welcome animation and the reconfigure prompt.")
+    parser.add_argument("--startup-check", action="store_true", help="Report startup time against the budget and exit.")
+    return parser.parse_args()
+
+def load_agent(config):
+    """Import and build the heavy agent components. Runs in the background during startup."""
+    from llm_components.agent_graph import build_agent
+    return build_agent(config)
 
 def get_user_input():
     return Prompt.ask("[bold green]You")
 
-def display_thinking_animation():
-    with Live(console=console, refresh_per_second=4) as live:
-        for i in range(3):
-            live.update(Spinner("dots", text="Processing..."))
-            time.sleep(0.5)
+def print_cache_stats(agent):
+    if agent["search_cache"] is not None:
+        stats = agent["search_cache"].stats()
+        console.print(f"[dim]Search cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries[/dim]")
+    if agent["page_cache"] is not None:
+        stats = agent["page_cache"].stats()
+        console.print(f"[dim]Page cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries[/dim]")
+    if agent["llm_cache"] is not None:
+        stats = agent["llm_cache"].stats()
+        console.print(f"[dim]LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), {stats['saved_seconds']:.1f}s saved[/dim]")
+
+def print_session_stats(tracer):
+    """Show rolling per-span aggregates for the session."""
+    stats = tracer.stats()
+    if not stats:
+        console.print("[dim]No stats recorded yet.[/dim]")
+        return
+    table = Table(title="Session stats")
+    for column in ["Span", "Count", "p50 ms", "p95 ms", "LLM calls", "Prompt tokens (cached)", "Completion tokens", "Retries", "Hedges", "Cache hits", "Errors"]:
+        table.add_column(column, justify="left" if column == "Span" else "right")
+    for name, span_stats in stats.items():
+        table.add_row(
+            name,
+            str(span_stats["count"]),
+            f"{span_stats['p50_ms']:.0f}",
+            f"{span_stats['p95_ms']:.0f}",
+            str(span_stats["llm_calls"]),
+            f"{span_stats['prompt_tokens']} ({span_stats['cached_prompt_tokens']})",
+            str(span_stats["completion_tokens"]),
+            str(span_stats["retries"]),
+            str(span_stats["hedges"]),
+            str(span_stats["cache_hits"]),
+            str(span_stats["errors"])
+        )
+    console.print(table)
+    speculative = stats.get("initial_response", {}).get("speculative_searches", 0)
+    if speculative:
+        hits = stats["initial_response"]["speculation_hits"]
+        console.print(f"[dim]Speculative first searches: {hits} of {speculative} used ({hits / speculative:.0%})[/dim]")
+
+def print_engine_stats(orchestrator):
+    """Show rolling per-engine search health."""
+    table = Table(title="Search engines")
+    for column in ["Engine", "Requests", "Cut short", "Failures", "Error rate", "p50 ms", "p95 ms", "Skipped"]:
+        table.add_column(column, justify="left" if column == "Engine" else "right")
+    for engine, engine_stats in orchestrator.stats().items():
+        table.add_row(
+            engine,
+            str(engine_stats["requests"]),
+            str(engine_stats["cut_short"]),
+            str(engine_stats["failures"]),
+            f"{engine_stats['error_rate']:.0%}",
+            f"{engine_stats['p50_ms']:.0f}",
+            f"{engine_stats['p95_ms']:.0f}",
+            f"{engine_stats['skips']}{' (cooling down)' if engine_stats['skipped'] else ''}"
+        )
+    console.print(table)
+
+def startup_check(agent_future):
+    prompt_ready = time.perf_counter() - _started
+    agent_future.result()
+    agent_ready = time.perf_counter() - _started
+    within_budget = prompt_ready <= STARTUP_BUDGET_SECONDS
+    style = "green" if within_budget else "red"
+    console.print(f"[{style}]Prompt ready in {prompt_ready:.3f}s (budget {STARTUP_BUDGET_SECONDS:.1f}s)[/{style}]")
+    console.print(f"[dim]Agent ready in {agent_ready:.3f}s[/dim]")
+    return 0 if within_budget else 1
 
 # Update the main function to use memory
 def main():
-    display_welcome_message()
-    
-    messages = [SystemMessage(content="You are an AI assistant with access to web search capabilities and memory of past interactions.")]
-    
-    memory_state = {"messages": []}
-    
+    args = parse_args()
+
+    # Get LLM configuration
+    config = asyncio.run(get_llm_config(ask_reconfigure=not args.no_splash))
+
+    # Build the LLM client and graph in the background while the welcome screen shows
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-startup")
+    agent_future = executor.submit(load_agent, config)
+
+    if args.startup_check:
+        sys.exit(startup_check(agent_future))
+
+    if not args.no_splash:
+        display_welcome_message()
+
+    agent = None
+    memory = None
+    # Checkpointed turns are keyed by session and turn number
+    session_id = uuid.uuid4().hex[:12]
+    turn = 0
+    recursion_limit = config.get("graph_recursion_limit", 25)
+    memory_token_budget = config.get("memory_token_budget", 2000)
+    retrieval_top_k = config.get("retrieval_top_k", 5)
+    retrieval_recent_turns = config.get("retrieval_recent_turns", 2)
+
     while True:
         try:
             user_input = get_user_input()
-            
+
             if user_input.lower() == 'quit':
+                if agent_future.done() and agent_future.exception() is None:
+                    print_cache_stats(agent_future.result())
+                    from llm_components.async_runtime import shutdown as shutdown_async_runtime
+                    shutdown_async_runtime()
                 console.print("[bold blue]Goodbye! Thanks for chatting.[/bold blue]")
                 break
-            
-            # Reset state for new interaction
-            messages = [SystemMessage(content="You are an AI assistant with access to web search capabilities and memory of past interactions.")]
-            messages.append(HumanMessage(content=user_input))
-            
-            memory_state["messages"].append({"role": "user", "content": user_input})
-            
-            display_thinking_animation()
-            
-            state = {
-                "messages": messages,
-                "search_results": [],
-                "analysis": "",
-                "search_count": 0,
-                "decision": "initial_response",  # Start with initial response
-                "search_query": user_input,
-                "memory": memory_state
-            }
-            
-            max_iterations = 10
-            iteration_count = 0
-            
-            while iteration_count < max_iterations:
-                previous_state = state.copy()
-                
-                state = graph.invoke(state)
-                
-                iteration_count += 1
-                
-                console.print(f"Iteration {iteration_count}: Decision = {state['decision']}, Search Count = {state['search_count']}, Query = '{state['search_query']}'")
-                
-                if END in state or state["decision"] == "respond":
-                    break
-                
-                if state == previous_state:
-                    console.print("[bold yellow]State unchanged. Breaking loop.[/bold yellow]")
-                    break
-            
-            # ... (rest of the code remains the same)
-            
+
+            if agent is None:
+                agent = agent_future.result()
+                from langgraph.errors import GraphRecursionError
+                from llm_components.tracing import span, token_usage_callback
+                from llm_components.agent_graph import initial_state, response_title, thread_config
+                from llm_components.memory import ConversationMemory
+                from llm_components.progress import NodeProgress
+                from llm_components.streaming import response_panel
+                checkpointer = agent["checkpointer"]
+                if checkpointer is not None and checkpointer.unfinished_turn() and user_input.strip() != '/resume':
+                    console.print("[bold yellow]An unfinished question from an earlier run was saved. Type /resume to finish it.[/bold yellow]")
+
+            if user_input.strip() == '/stats':
+                print_session_stats(agent["tracer"])
+                if agent["search_orchestrator"] is not None:
+                    print_engine_stats(agent["search_orchestrator"])
+                continue
+
+            # Pick up a failed or interrupted turn from its last completed node
+            resume = user_input.strip() == '/resume'
+            if resume:
+                pending = checkpointer.unfinished_turn() if checkpointer is not None else None
+                if pending is None:
+                    console.print("[dim]No unfinished question to resume.[/dim]")
+                    continue
+                thread_id, user_input = pending
+                console.print(f"[dim]Resuming: {user_input}[/dim]")
+
+            if memory is None:
+                memory = ConversationMemory(agent["llm"], token_budget=memory_token_budget)
+            memory.add("user", user_input)
+            retrieval_index = agent["retrieval_index"]
+
+            if resume:
+                run_thread = thread_config(agent, thread_id)
+                state = agent["graph"].get_state(run_thread).values
+                graph_input = None
+            else:
+                if retrieval_index is not None:
+                    # Older turns are replaced by the snippets most relevant to this question
+                    recent_history = memory.render_recent(2 * retrieval_recent_turns + 1)
+                    relevant_context = retrieval_index.render_context(user_input, k=retrieval_top_k, exclude=recent_history)
+                    conversation_history = "\n\n".join(part for part in (relevant_context, recent_history) if part)
+                else:
+                    conversation_history = memory.render()
+
+                state = initial_state(user_input, conversation_history)
+                turn += 1
+                thread_id = checkpointer.start_turn(session_id, turn, user_input) if checkpointer is not None else None
+                run_thread = thread_config(agent, thread_id)
+                graph_input = state
+
+            # Run the whole turn as one graph execution, reporting each node as it finishes
+            with span("turn"):
+                try:
+                    with NodeProgress(console):
+                        run_config = {"recursion_limit": recursion_limit, "callbacks": [token_usage_callback], **run_thread}
+                        for update in agent["graph"].stream(graph_input, config=run_config, stream_mode="updates"):
+                            for node_name, node_state in update.items():
+                                state = {**state, **node_state}
+                                console.print(f"[dim]{node_name}: Decision = {state['decision']}, Search Count = {state['search_count']}[/dim]")
+                except GraphRecursionError:
+                    console.print(f"[bold yellow]Step limit of {recursion_limit} reached. Responding with the information gathered so far.[/bold yellow]")
+                    state = agent["respond"](state)
+
             ai_response = state["messages"][-1].content
-            memory_state["messages"].append({"role": "assistant", "content": ai_response})
-            
+            memory.add("assistant", ai_response)
+            if thread_id is not None:
+                checkpointer.finish_turn(thread_id)
+            if retrieval_index is not None:
+                retrieval_index.add_turn(user_input, ai_response, state["analysis"], state["search_results"])
+
             # Add error checking for the AI response
             if "error" in ai_response.lower() or "insufficient information" in ai_response.lower():
                 console.print("[bold yellow]Warning: The AI encountered issues while processing your request. The response may be incomplete or inaccurate.[/bold yellow]")
-            
-            # Create a simple panel for the final response
-            response_panel = Panel(
-                Markdown(ai_response),
-                title=f"AI Assistant Response ({config['llm_provider'].capitalize()} - {config['model']})",
-                expand=False,
-                border_style="cyan",
-                padding=(1, 1),
-                style="on black"
-            )
-            
-            console.print("\n")  # Add some space before the final response
-            console.print(response_panel)
+
+            # Show the final response, unless it was already streamed to the console
+            if not state.get("streamed"):
+                console.print("\n")  # Add some space before the final response
+                console.print(response_panel(ai_response, response_title(config)))
+            if state.get("budget_binding"):
+                console.print(f"[dim]{agent['governor'].describe(state)}[/dim]")
             console.print("\n")  # Add some space after the final response
-            
-            # Reset the state for the next iteration
-            messages = [SystemMessage(content="You are an AI assistant with access to web search capabilities and memory of past interactions.")]
-            messages.extend(state["messages"][-2:])  # Keep only the last user message and AI response
-            
+
         except Exception as e:
             console.print(Panel(f"An error occurred: {str(e)}", title="[bold red]Error[/bold red]", border_style="red"))
-            console.print("[bold yellow]Resetting conversation due to error. Please try your query again.[/bold yellow]")
-            messages = [SystemMessage(content="You are an AI assistant with access to web search capabilities and memory of past interactions.")]
-            memory_state = {"messages": []}
+            # Keep the conversation; only the unanswered question is dropped
+            if memory is not None:
+                memory.discard_last("user")
+            if agent is not None and agent["checkpointer"] is not None:
+                console.print("[bold yellow]Your conversation is kept. Type /resume to continue this question from its last completed step.[/bold yellow]")
+            else:
+                console.print("[bold yellow]Your conversation is kept. Please try your query again.[/bold yellow]")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
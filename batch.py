@@ -0,0 +1,120 @@
+"""Headless batch mode: answer a file of questions with bounded concurrency.
+
+Questions are read from a JSONL file (one {"id": ..., "question": ...} object
+per line) or from stdin, where plain text lines are also accepted. Each
+question runs as an independent graph execution; the LLM client and search
+cache are shared. Answers are written as JSONL, one line per question as it
+finishes:
+
+    python batch.py questions.jsonl --concurrency 8 --output answers.jsonl
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config_manager import load_config
+
+
+def read_questions(stream) -> list:
+    questions = []
+    for index, line in enumerate(stream):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            item = json.loads(line)
+        else:
+            item = {"question": line}
+        item.setdefault("id", index)
+        questions.append(item)
+    return questions
+
+
+def answer_question(agent, item: dict) -> dict:
+    """Run one question through the graph and collect its answer and timing metadata."""
+    from langgraph.errors import GraphRecursionError
+    from llm_components.agent_graph import initial_state
+    from llm_components.tracing import span, token_usage_callback
+
+    question = item["question"]
+    recursion_limit = agent["config"].get("graph_recursion_limit", 25)
+    started = time.perf_counter()
+    result = {"id": item["id"], "question": question}
+    with span("batch_question") as question_span:
+        try:
+            state = initial_state(question, f"User: {question}")
+            try:
+                # Keep the latest state, so a step-limit response uses the searches gathered so far
+                for state in agent["graph"].stream(state, config={"recursion_limit": recursion_limit, "callbacks": [token_usage_callback]}, stream_mode="values"):
+                    pass
+            except GraphRecursionError:
+                state = agent["respond"](state)
+            result["answer"] = state["messages"][-1].content
+            result["search_count"] = state["search_count"]
+            result["budget_binding"] = state.get("budget_binding") or None
+            result["error"] = None
+        except Exception as e:
+            result["answer"] = None
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    result.update({counter: question_span.counters[counter] for counter in ["llm_calls", "prompt_tokens", "completion_tokens", "cache_hits"]})
+    return result
+
+
+def run_batch(agent, questions: list, output, concurrency: int = 4) -> int:
+    """Answer questions concurrently, writing each result as soon as it finishes. Returns the error count."""
+    write_lock = threading.Lock()
+    errors = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        futures = [executor.submit(answer_question, agent, item) for item in questions]
+        for future in as_completed(futures):
+            result = future.result()
+            if result["error"]:
+                errors += 1
+            with write_lock:
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions without the interactive UI.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of questions, or '-' for stdin (default).")
+    parser.add_argument("--output", default="-", help="JSONL file for answers, or '-' for stdout (default).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum questions answered at once.")
+    args = parser.parse_args()
+
+    config = load_config()
+    if not config:
+        sys.exit("No config.json found. Run `python config_manager.py` first.")
+    # Rich rendering, token streaming and /resume checkpoints are for the interactive UI only
+    config = {**config, "stream_responses": False, "checkpoint_enabled": False}
+
+    from llm_components import graph_nodes
+    from llm_components.agent_graph import build_agent
+    from llm_components.async_runtime import shutdown as shutdown_async_runtime
+    graph_nodes.console.quiet = True
+
+    if args.input == "-":
+        questions = read_questions(sys.stdin)
+    else:
+        with open(args.input, "r") as f:
+            questions = read_questions(f)
+
+    agent = build_agent(config)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    started = time.perf_counter()
+    try:
+        errors = run_batch(agent, questions, output, concurrency=args.concurrency)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        shutdown_async_runtime()
+    print(f"Answered {len(questions)} questions ({errors} errors) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import random
+import re
+import threading
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+
+FILLER_WORDS = "the results indicate that the topic is covered by several sources with consistent details".split()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure, shaped like an SDK error with an HTTP status."""
+
+    def __init__(self, status_code: int = 429):
+        super().__init__(f"Fake provider error {status_code}")
+        self.status_code = status_code
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model that follows the agent's prompt protocols.
+
+    It recognises each node's prompt by the reply format it asks for and
+    answers in that format, sleeping `latency` seconds per call plus
+    `token_latency` per generated token. Questions listed in `direct_answers`
+    are answered by the initial triage; every other question is searched
+    `search_rounds` times before the decide step chooses to respond.
+
+    For resilience testing, a call fails with a `FakeProviderError` with
+    probability `error_rate`, and takes `slow_latency` seconds instead of
+    `latency` with probability `slow_rate`.
+
+    Like a provider prompt cache, a system message seen before is reported
+    as cached input tokens, provided it reaches `min_cached_tokens`, the
+    provider's minimum cacheable prefix (1024 for Anthropic, 2048 for Haiku).
+    """
+
+    latency: float = 0.05
+    token_latency: float = 0.0
+    output_tokens: int = 60
+    search_rounds: int = 2
+    direct_answers: List[str] = []
+    error_rate: float = 0.0
+    error_status: int = 429
+    slow_rate: float = 0.0
+    slow_latency: float = 1.0
+    seed: int = 0
+    min_cached_tokens: int = 1024
+    errors: int = 0
+    cached_prompt_tokens: int = 0
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    lock: Any = None
+    rng: Any = None
+    cached_prefixes: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+        self.rng = random.Random(self.seed)
+        self.cached_prefixes = set()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-agent-model"
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.errors = 0
+            self.cached_prompt_tokens = 0
+
+    def _cached_tokens(self, messages) -> int:
+        """Tokens of the system prefix served from the emulated prompt cache. Call with the lock held."""
+        if not messages or messages[0].type != "system":
+            return 0
+        system = str(messages[0].content)
+        if estimate_tokens(system) < self.min_cached_tokens:
+            return 0
+        if system in self.cached_prefixes:
+            return estimate_tokens(system)
+        self.cached_prefixes.add(system)
+        return 0
+
+    def _call_latency(self) -> float:
+        """Latency of this call, raising an injected error first if one is drawn."""
+        with self.lock:
+            fail = self.rng.random() < self.error_rate
+            slow = self.rng.random() < self.slow_rate
+            if fail:
+                self.errors += 1
+        if fail:
+            time.sleep(self.latency)
+            raise FakeProviderError(self.error_status)
+        return self.slow_latency if slow else self.latency
+
+    def _filler(self, count: int) -> str:
+        return " ".join(FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(count))
+
+    def reply(self, prompt: str, question: str) -> str:
+        """Pick the reply for a rendered prompt."""
+        if "SEARCH_NEEDED" in prompt:
+            if question.strip() in self.direct_answers:
+                return f"ANSWER: {self._filler(self.output_tokens)}"
+            return "SEARCH_NEEDED"
+        if "QUERY: [search query]" in prompt:
+            return "\n".join(f"QUERY: {question} aspect {i + 1}" for i in range(3))
+        if "'RELEVANT: [original query]'" in prompt:
+            query = re.search(r"Proposed search query: (.*)", prompt)
+            return f"RELEVANT: {query.group(1).strip() if query else question}"
+        if "'RESPOND'" in prompt:
+            count = re.search(r"search count: (\d+)", prompt)
+            if count and int(count.group(1)) < self.search_rounds:
+                return f"SEARCH: {question} more details"
+            return "RESPOND"
+        if "<response>" in prompt:
+            return f"<response>{self._filler(self.output_tokens)}</response>"
+        return self._filler(self.output_tokens)
+
+    def with_structured_output(self, schema, **kwargs):
+        """Answer the combined analyze/decide step with a `schema` instance instead of text."""
+        def research_step(prompt_value):
+            latency = self._call_latency()
+            prompt = "\n".join(str(message.content) for message in prompt_value.to_messages())
+            question = re.search(r"User's question: (.*)", prompt)
+            question = question.group(1).strip() if question else ""
+            count = re.search(r"Searches performed so far: (\d+)", prompt)
+            sufficient = not count or int(count.group(1)) >= self.search_rounds
+            step = schema(
+                analysis=self._filler(self.output_tokens),
+                sufficient=sufficient,
+                next_search=None if sufficient else {"query": f"{question} more details"}
+            )
+            with self.lock:
+                self.calls += 1
+                self.prompt_tokens += estimate_tokens(prompt)
+                self.cached_prompt_tokens += self._cached_tokens(prompt_value.to_messages())
+                self.completion_tokens += estimate_tokens(step.model_dump_json())
+            time.sleep(latency + self.token_latency * estimate_tokens(step.analysis))
+            return step
+        return RunnableLambda(research_step)
+
+    def _respond(self, messages) -> str:
+        latency = self._call_latency()
+        prompt = "\n".join(str(message.content) for message in messages)
+        question = messages[-1].content if messages else ""
+        question_match = re.search(r"(?:User's question|user's question): (.*)", prompt)
+        if question_match:
+            question = question_match.group(1)
+        text = self.reply(prompt, str(question))
+        with self.lock:
+            cached_tokens = self._cached_tokens(messages)
+            self.calls += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+            self.cached_prompt_tokens += cached_tokens
+            self.completion_tokens += estimate_tokens(text)
+        time.sleep(latency)
+        return text, estimate_tokens(prompt), cached_tokens
+
+    def _usage(self, prompt_tokens: int, text: str, cached_tokens: int = 0) -> dict:
+        completion_tokens = estimate_tokens(text)
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "input_token_details": {"cache_read": cached_tokens}
+        }
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        text, prompt_tokens, cached_tokens = self._respond(messages)
+        time.sleep(self.token_latency * estimate_tokens(text))
+        message = AIMessage(content=text, usage_metadata=self._usage(prompt_tokens, text, cached_tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        text, prompt_tokens, cached_tokens = self._respond(messages)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_latency)
+            chunk_text = word if i == 0 else f" {word}"
+            usage = self._usage(prompt_tokens, text, cached_tokens) if i == len(words) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=chunk_text, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk_text, chunk=chunk)
+            yield chunk
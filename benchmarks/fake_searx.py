@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# Where each engine's results start, so engines overlap partly like real ones do
+ENGINE_OFFSETS = {"google": 0, "bing": 2, "duckduckgo": 4}
+
+
+def fake_results(query: str, count: int = 5, base_url: str = "https://example.com", engine: str = "google") -> list:
+    """Deterministic SearxNG-style results for a query from one engine."""
+    digest = hashlib.sha1(query.lower().encode("utf-8")).hexdigest()
+    offset = ENGINE_OFFSETS.get(engine, 0)
+    return [
+        {
+            "url": f"{base_url}/pages/{digest[:8]}/{i}",
+            "title": f"{query} - result {i + 1}",
+            "content": f"Information about {query}. Source {i + 1} covers the main facts and recent developments.",
+            "engines": [engine],
+            "category": "general"
+        }
+        for i in range(offset, offset + count)
+    ]
+
+
+def merge_engine_results(batches: list, count: int) -> list:
+    """Combine per-engine results the way SearxNG does, merging the engines of duplicate URLs."""
+    merged = {}
+    for batch in batches:
+        for result in batch:
+            if result["url"] in merged:
+                merged[result["url"]]["engines"] += result["engines"]
+            else:
+                merged[result["url"]] = {**result, "engines": list(result["engines"])}
+    return sorted(merged.values(), key=lambda result: int(result["url"].rsplit("/", 1)[1]))[:count]
+
+
+def fake_page(path: str, paragraphs: int = 12) -> str:
+    """Deterministic HTML page with navigation chrome around an article."""
+    body = "".join(
+        f"<p>Paragraph {i + 1} of {path} explains one part of the topic in detail, "
+        f"with dates, figures and background that a search snippet leaves out.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>Page {path}</title><script>var tracking = 1;</script></head>"
+        f"<body><nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+        f"<article><h1>Page {path}</h1>{body}</article>"
+        f"<footer>Copyright and cookie notice</footer></body></html>"
+    )
+
+
+class FakeSearxServer(ThreadingHTTPServer):
+    """Local stand-in for the SearxNG JSON API.
+
+    `engine_latency` adds seconds to requests that include an engine, and
+    `engine_error_rate` is the fraction of requests in which an engine fails
+    and is reported under `unresponsive_engines`, as SearxNG does.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, latency: float = 0.1,
+                 engine_latency: dict = None, engine_error_rate: dict = None, seed: int = 0):
+        super().__init__((host, port), FakeSearxHandler)
+        self.latency = latency
+        self.engine_latency = engine_latency or {}
+        self.engine_error_rate = engine_error_rate or {}
+        self.request_count = 0
+        self.page_request_count = 0
+        self.engine_request_counts = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="fake-searx", daemon=True).start()
+        return self
+
+
+class FakeSearxHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/pages/"):
+            return self.send_page()
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get("q", [""])[0]
+        engines = [engine for engine in params.get("engines", ["google"])[0].split(",") if engine]
+        with self.server.lock:
+            self.server.request_count += 1
+            for engine in engines:
+                self.server.engine_request_counts[engine] = self.server.engine_request_counts.get(engine, 0) + 1
+            failed = [engine for engine in engines if self.server.rng.random() < self.server.engine_error_rate.get(engine, 0.0)]
+        # SearxNG waits for its slowest engine before answering
+        time.sleep(self.server.latency + max((self.server.engine_latency.get(engine, 0.0) for engine in engines), default=0.0))
+        batches = [fake_results(query, base_url=self.server.url, engine=engine) for engine in engines if engine not in failed]
+        body = json.dumps({
+            "query": query,
+            "results": merge_engine_results(batches, 5),
+            "unresponsive_engines": [[engine, "HTTP error"] for engine in failed]
+        }).encode("utf-8")
+        self.send(200, {"Content-Type": "application/json"}, body)
+
+    def send_page(self):
+        """Serve a static result page, answering conditional requests with 304."""
+        with self.server.lock:
+            self.server.page_request_count += 1
+        time.sleep(self.server.latency)
+        etag = f'"{hashlib.sha1(self.path.encode("utf-8")).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self.send(304, {"ETag": etag})
+        self.send(200, {"Content-Type": "text/html; charset=utf-8", "ETag": etag}, fake_page(self.path).encode("utf-8"))
+
+    def send(self, status: int, headers: dict, body: bytes = None):
+        """Write a response, ignoring clients that hung up, like the orchestrator cancelling slow engines."""
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if body is not None:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body is not None:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local SearxNG stand-in.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--engine-latency", default="{}", help="JSON object of extra seconds per engine, e.g. '{\"bing\": 2}'.")
+    parser.add_argument("--engine-error-rate", default="{}", help="JSON object of failure rate per engine, e.g. '{\"duckduckgo\": 1}'.")
+    args = parser.parse_args()
+    server = FakeSearxServer(
+        port=args.port,
+        latency=args.latency,
+        engine_latency=json.loads(args.engine_latency),
+        engine_error_rate=json.loads(args.engine_error_rate)
+    )
+    print(f"Fake SearxNG listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,300 @@
+"""Offline benchmark for the agent graph.
+
+Runs a canned question set through the real graph and nodes, using a
+deterministic fake chat model and a local SearxNG stand-in, and reports
+latency percentiles per node and per turn together with LLM call, prompt
+token and search counts. Results can be saved as a baseline and compared
+against later runs:
+
+    python -m benchmarks.run_benchmark --save-baseline
+    python -m benchmarks.run_benchmark --compare
+    python -m benchmarks.run_benchmark --searx-down --compare
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.fake_searx import FakeSearxServer
+from llm_components import graph_nodes
+from llm_components.agent_graph import build_agent, initial_state, thread_config
+from llm_components.async_runtime import shutdown as shutdown_async_runtime
+from llm_components import resilient_llm
+from llm_components.tracing import token_usage_callback
+from llm_components.turn_budget import BUDGETS
+
+console = Console()
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QUESTIONS = os.path.join(BENCHMARK_DIR, "questions.jsonl")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+SEARX_DOWN_BASELINE = os.path.join(BENCHMARK_DIR, "baseline_searx_down.json")
+
+# Metrics compared against the baseline; higher is worse for all of them
+REGRESSION_METRICS = ["turn_p50", "turn_p95", "llm_calls", "prompt_tokens", "searches", "search_rounds"]
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def load_questions(path: str) -> list:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def closed_port_url() -> str:
+    """URL of a local port nothing listens on, standing in for a SearxNG that is down."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def benchmark_config(searx_url: str, overrides: dict) -> dict:
+    return {
+        "llm_provider": "fake",
+        "model": "fake-agent-model",
+        "searxng_host": searx_url,
+        "search_cache_enabled": False,
+        "page_cache_enabled": False,
+        "checkpoint_enabled": False,
+        "stream_responses": False,
+        **overrides
+    }
+
+
+def run_turn(agent, question: str) -> dict:
+    """Run one question through the graph, timing every node."""
+    state = initial_state(question, f"User: {question}")
+    node_times = []
+    started = last = time.perf_counter()
+    recursion_limit = agent["config"].get("graph_recursion_limit", 25)
+    checkpointer = agent["checkpointer"]
+    thread_id = checkpointer.start_turn("benchmark", time.time_ns(), question) if checkpointer is not None else None
+    # The token callback feeds the per-turn budgets
+    run_config = {"recursion_limit": recursion_limit, "callbacks": [token_usage_callback], **thread_config(agent, thread_id)}
+    for update in agent["graph"].stream(state, config=run_config, stream_mode="updates"):
+        now = time.perf_counter()
+        for node_name, node_state in update.items():
+            state = {**state, **node_state}
+            node_times.append((node_name, now - last))
+        last = now
+    if thread_id is not None:
+        checkpointer.finish_turn(thread_id)
+    return {
+        "turn_seconds": time.perf_counter() - started,
+        "node_times": node_times,
+        "search_count": state["search_count"],
+        "budget_binding": state["budget_binding"]
+    }
+
+
+def run_benchmark(questions, llm, searx, config, repeat: int = 1) -> dict:
+    agent = build_agent(config, llm=llm)
+    llm.reset_counters()
+    searx.request_count = 0
+    searx.page_request_count = 0
+    searx.engine_request_counts = {}
+    resilient_llm.reset_metrics()
+    turn_times, node_times, failed_turns, search_rounds = [], {}, 0, 0
+    budget_bound = dict.fromkeys(BUDGETS, 0)
+    for _ in range(repeat):
+        for item in questions:
+            try:
+                result = run_turn(agent, item["question"])
+            except Exception as e:
+                failed_turns += 1
+                console.print(f"[red]Turn failed: {item['question']}: {e}[/red]")
+                continue
+            turn_times.append(result["turn_seconds"])
+            search_rounds += result["search_count"]
+            if result["budget_binding"]:
+                budget_bound[result["budget_binding"]] += 1
+            for node_name, seconds in result["node_times"]:
+                node_times.setdefault(node_name, []).append(seconds)
+    # Per-turn averages cover every attempted turn, so failures cannot make a run look cheaper
+    turns = len(turn_times) + failed_turns or 1
+    llm_metrics = resilient_llm.metrics()
+    triage_stats = agent["tracer"].stats().get("initial_response", {})
+    speculative_searches = triage_stats.get("speculative_searches", 0)
+    decide_stats = agent["tracer"].stats().get("decide", {})
+    sufficiency_checks = decide_stats.get("sufficiency_checks", 0)
+    return {
+        "turns": len(turn_times),
+        "failed_turns": failed_turns,
+        "turn_p50": percentile(turn_times, 0.5),
+        "turn_p95": percentile(turn_times, 0.95),
+        "nodes": {
+            name: {"count": len(times), "p50": percentile(times, 0.5), "p95": percentile(times, 0.95)}
+            for name, times in node_times.items()
+        },
+        "llm_calls": llm.calls / turns,
+        "prompt_tokens": llm.prompt_tokens / turns,
+        "cached_prompt_tokens": llm.cached_prompt_tokens / turns,
+        "completion_tokens": llm.completion_tokens / turns,
+        "searches": searx.request_count / turns,
+        "search_rounds": search_rounds / turns,
+        "page_fetches": searx.page_request_count / turns,
+        "llm_errors": llm.errors / turns,
+        "llm_retries": llm_metrics["retries"] / turns,
+        "llm_hedges": llm_metrics["hedges"] / turns,
+        "llm_hedge_wins": llm_metrics["hedge_wins"] / turns,
+        "speculation_hit_rate": triage_stats.get("speculation_hits", 0) / speculative_searches if speculative_searches else None,
+        "decide_skip_rate": decide_stats.get("sufficiency_skips", 0) / decide_stats["count"] if decide_stats and config.get("sufficiency_scorer") else None,
+        "sufficiency_agreement": decide_stats.get("sufficiency_agreements", 0) / sufficiency_checks if sufficiency_checks else None,
+        "budget_bound": {budget: count / turns for budget, count in budget_bound.items()},
+        "engines": agent["search_orchestrator"].stats() if agent["search_orchestrator"] is not None else None
+    }
+
+
+def print_report(report: dict):
+    nodes = Table(title="Node latency")
+    nodes.add_column("Node")
+    nodes.add_column("Runs", justify="right")
+    nodes.add_column("p50 (ms)", justify="right")
+    nodes.add_column("p95 (ms)", justify="right")
+    for name, stats in report["nodes"].items():
+        nodes.add_row(name, str(stats["count"]), f"{stats['p50'] * 1000:.1f}", f"{stats['p95'] * 1000:.1f}")
+    console.print(nodes)
+
+    summary = Table(title=f"Per turn ({report['turns']} turns)")
+    summary.add_column("Metric")
+    summary.add_column("Value", justify="right")
+    summary.add_row("Turn p50 (ms)", f"{report['turn_p50'] * 1000:.1f}")
+    summary.add_row("Turn p95 (ms)", f"{report['turn_p95'] * 1000:.1f}")
+    summary.add_row("LLM calls", f"{report['llm_calls']:.2f}")
+    summary.add_row("Prompt tokens", f"{report['prompt_tokens']:.0f}")
+    summary.add_row("Cached prompt tokens", f"{report['cached_prompt_tokens']:.0f}")
+    summary.add_row("Completion tokens", f"{report['completion_tokens']:.0f}")
+    summary.add_row("Searches", f"{report['searches']:.2f}")
+    summary.add_row("Search rounds", f"{report['search_rounds']:.2f}")
+    summary.add_row("Page fetches", f"{report['page_fetches']:.2f}")
+    summary.add_row("Injected LLM errors", f"{report['llm_errors']:.2f}")
+    summary.add_row("LLM retries", f"{report['llm_retries']:.2f}")
+    summary.add_row("LLM hedges (won)", f"{report['llm_hedges']:.2f} ({report['llm_hedge_wins']:.2f})")
+    summary.add_row("Failed turns", str(report["failed_turns"]))
+    if report["speculation_hit_rate"] is not None:
+        summary.add_row("Speculation hit rate", f"{report['speculation_hit_rate']:.0%}")
+    if report["decide_skip_rate"] is not None:
+        summary.add_row("Decide calls skipped", f"{report['decide_skip_rate']:.0%}")
+    for budget, share in report["budget_bound"].items():
+        if share:
+            summary.add_row(f"Turns bound by {budget}", f"{share:.0%}")
+    if report["sufficiency_agreement"] is not None:
+        summary.add_row("Scorer agreement with LLM", f"{report['sufficiency_agreement']:.0%}")
+    console.print(summary)
+
+    if report["engines"]:
+        engines = Table(title="Search engines")
+        for column in ["Engine", "Requests", "Cut short", "Failures", "Skips", "p50 (ms)", "p95 (ms)"]:
+            engines.add_column(column, justify="left" if column == "Engine" else "right")
+        for name, stats in report["engines"].items():
+            engines.add_row(name, str(stats["requests"]), str(stats["cut_short"]), str(stats["failures"]), str(stats["skips"]), f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}")
+        console.print(engines)
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Return descriptions of metrics that regressed by more than `tolerance`."""
+    regressions = []
+    # Any failed turn is a regression, whatever the baseline recorded
+    if report["failed_turns"]:
+        regressions.append(f"failed_turns: {report['failed_turns']} of {report['turns'] + report['failed_turns']} turns failed")
+    for metric in REGRESSION_METRICS:
+        previous, current = baseline.get(metric), report[metric]
+        if previous is not None and current > previous * (1 + tolerance):
+            regressions.append(f"{metric}: {previous:.4g} -> {current:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agent graph offline.")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="JSONL file of {\"question\": ..., \"search\": bool} entries.")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of passes over the question set.")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Fake LLM latency per call, in seconds.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Fake LLM latency per generated token, in seconds.")
+    parser.add_argument("--output-tokens", type=int, default=60, help="Words generated by the fake LLM per answer.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake LLM calls that fail with a retryable 429.")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of fake LLM calls that take --slow-latency instead.")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency of slow fake LLM calls, in seconds.")
+    parser.add_argument("--min-cached-tokens", type=int, default=1024, help="Shortest system prompt the fake prompt cache serves, in tokens.")
+    parser.add_argument("--search-rounds", type=int, default=2, help="Search rounds the fake LLM asks for before responding.")
+    parser.add_argument("--searx-latency", type=float, default=0.1, help="Fake SearxNG latency per request, in seconds.")
+    parser.add_argument("--engine-latency", default="{}", help="JSON object of extra fake SearxNG latency per engine, e.g. '{\"bing\": 2}'.")
+    parser.add_argument("--engine-error-rate", default="{}", help="JSON object of fake SearxNG failure rate per engine, e.g. '{\"duckduckgo\": 1}'.")
+    parser.add_argument("--searx-port", type=int, default=8080, help="Port for the fake SearxNG server.")
+    parser.add_argument("--searx-down", action="store_true", help="Point the agent at a closed port, as if SearxNG were down, with the sufficiency scorer on unless --config turns it off. Uses its own baseline.")
+    parser.add_argument("--config", default="{}", help="JSON object of agent config overrides, e.g. '{\"search_fanout\": 3}'.")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    parser.add_argument("--baseline", help="Baseline report file. Defaults to benchmarks/baseline.json, or baseline_searx_down.json with --searx-down.")
+    parser.add_argument("--save-baseline", action="store_true", help="Save this run as the new baseline.")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline and exit non-zero on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression when comparing.")
+    args = parser.parse_args()
+    baseline = args.baseline or (SEARX_DOWN_BASELINE if args.searx_down else DEFAULT_BASELINE)
+
+    # Node output is not part of what we measure
+    graph_nodes.console.quiet = True
+
+    questions = load_questions(args.questions)
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        token_latency=args.token_latency,
+        output_tokens=args.output_tokens,
+        search_rounds=args.search_rounds,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        min_cached_tokens=args.min_cached_tokens,
+        direct_answers=[item["question"] for item in questions if not item.get("search", True)]
+    )
+    searx = FakeSearxServer(
+        port=args.searx_port,
+        latency=args.searx_latency,
+        engine_latency=json.loads(args.engine_latency),
+        engine_error_rate=json.loads(args.engine_error_rate)
+    ).start()
+    try:
+        overrides = json.loads(args.config)
+        searx_url = searx.url
+        if args.searx_down:
+            # The scorer decides failed searches without the LLM, which this scenario guards
+            searx_url = closed_port_url()
+            overrides = {"sufficiency_scorer": True, **overrides}
+        report = run_benchmark(questions, llm, searx, benchmark_config(searx_url, overrides), repeat=args.repeat)
+    finally:
+        searx.shutdown()
+        shutdown_async_runtime()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        console.print(f"[green]Baseline saved to {baseline}[/green]")
+    if args.compare:
+        with open(baseline, "r") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            console.print("[bold red]Regressions against baseline:[/bold red]")
+            for regression in regressions:
+                console.print(f"  {regression}")
+            sys.exit(1)
+        console.print("[green]No regressions against baseline.[/green]")
+
+
+if __name__ == "__main__":
+    main()
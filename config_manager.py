@@ -13,6 +13,15 @@ console = Console()
 
 CONFIG_FILE = "config.json"
 
+# Models offered during setup, largest first
+PROVIDER_MODELS = {
+    "openai": ["gpt-4o", "gpt-4o-mini"],
+    "anthropic": ["claude-3-5-sonnet-20240620", "claude-3-haiku-20240307"]
+}
+
+# Graph nodes that only classify or route, which a small fast model handles well
+CONTROL_NODES = ["initial_response", "search", "decide", "analyze_decide"]
+
 ASCII_ART = r"""
 
 
@@ -92,19 +101,44 @@ async def setup_menu():
     config[f"{config['llm_provider']}_api_key"] = api_key
     
     # Choose model
+    models = PROVIDER_MODELS[config["llm_provider"]]
     if config["llm_provider"] == "openai":
         model = Prompt.ask(
             "Choose OpenAI model",
-            choices=["gpt-4o", "gpt-4o-mini"],
+            choices=models,
             default="gpt-4o-mini"
         )
     else:  # anthropic
         model = Prompt.ask(
             "Choose Anthropic model",
-            choices=["claude-3-5-sonnet-20240620"],
+            choices=models,
             default="claude-3-5-sonnet-20240620"
         )
     config["model"] = model
+
+    # Route the short control steps (triage, query checks, decide) to a faster model
+    control_model = Prompt.ask(
+        "Choose model for control steps (triage, query checks, search decisions)",
+        choices=models,
+        default=models[-1]
+    )
+    if control_model != model:
+        config["node_models"] = {node: control_model for node in CONTROL_NODES}
+    else:
+        config.pop("node_models", None)
+
+    # Fall back to the other model when the chosen one errors or times out. Each node skips
+    # its own model in the list, so control steps on the smaller model fall back to the main one.
+    other_models = [other for other in models if other != model]
+    if control_model != model:
+        question = f"Fall back between {model} and {control_model} when one is slow or erroring?"
+    else:
+        question = f"Fall back to {other_models[0]} when a model is slow or erroring?" if other_models else ""
+    if other_models and Confirm.ask(question, default=True):
+        config["model_fallbacks"] = other_models[:1] + ([model] if control_model != model else [])
+        config.setdefault("llm_timeout", 60)
+    else:
+        config.pop("model_fallbacks", None)
     
     save_config(config)
     console.print("[green]Configuration saved successfully![/green]")
@@ -114,9 +148,9 @@ async def setup_menu():
     console.print(panel, justify="center")
     await asyncio.sleep(2)
 
-async def get_llm_config():
+async def get_llm_config(ask_reconfigure=True):
     config = load_config()
-    if not config or Confirm.ask("Do you want to reconfigure the AI assistant?"):
+    if not config or (ask_reconfigure and Confirm.ask("Do you want to reconfigure the AI assistant?")):
         await setup_menu()
         config = load_config()
     return config
@@ -0,0 +1,236 @@
+import uuid
+from langgraph.graph import StateGraph, END
+from langchain_core.messages import SystemMessage, HumanMessage
+from llm_components.shared import get_llm, get_node_llms, node_model_spec, configure_search_cache, configure_searx, AgentState
+from llm_components.page_fetch import configure_page_fetch
+from llm_components.checkpoint import SQLiteCheckpointer
+from llm_components.resilient_llm import make_resilient
+from llm_components.llm_cache import CachedChatModel, LLMResponseCache
+from llm_components.retrieval import RetrievalIndex
+from llm_components.progress import tracked_node
+from llm_components.tracing import configure_tracing, span
+from llm_components.turn_budget import TurnGovernor, add_usage, empty_usage
+from llm_components.graph_nodes import (
+    search_node, fetch_node, analyze_node, decide_node, analyze_decide_node, respond_node,
+    initial_response_node, speculative_initial_response_node
+)
+
+
+NODE_NAMES = ["initial_response", "search", "analyze", "decide", "analyze_decide", "respond"]
+
+SYSTEM_PROMPT = "You are an AI assistant with access to web search capabilities and memory of past interactions."
+
+
+def response_title(config) -> str:
+    spec = node_model_spec(config, "respond")
+    return f"AI Assistant Response ({spec['provider'].capitalize()} - {spec['model']})"
+
+
+def graph_node(name: str, node):
+    """Wrap a node for the progress display and tracing, adding its run time, LLM calls and tokens to the turn's usage."""
+    def run(state):
+        with span(name) as node_span:
+            result = node(state)
+        return {**result, "usage": add_usage(state["usage"], node_span)}
+    return tracked_node(name, run)
+
+
+def build_agent(config, llm=None) -> dict:
+    """Build the LLM client, caches, retrieval index and compiled graph for a configuration.
+
+    Pass `llm` to use an existing chat model for every node instead of building
+    them from the config.
+    """
+    # Initialize LLMs, per node when `node_models` routes steps to different models
+    if llm is None:
+        llm = get_llm(config)
+        base_llms = get_node_llms(config, NODE_NAMES)
+    else:
+        if config.get("llm_resilience_enabled", True):
+            llm = make_resilient(llm, config, config["llm_provider"])
+        base_llms = dict.fromkeys(NODE_NAMES, llm)
+
+    # Record per-node spans for /stats and the trace file
+    tracer = configure_tracing(config)
+
+    # Point searches at the configured SearxNG instance and set up the result cache
+    search_orchestrator = configure_searx(config)
+    search_cache = configure_search_cache(config)
+
+    # Save the state after every node, so failed or interrupted turns can be resumed
+    checkpointer = SQLiteCheckpointer(
+        path=config.get("checkpoint_path", "checkpoints.db"),
+        max_turns=config.get("checkpoint_max_turns", 50)
+    ) if config.get("checkpoint_enabled", True) else None
+
+    # Optionally read the top result pages after each search
+    page_fetch = config.get("page_fetch_enabled", False)
+    page_cache = configure_page_fetch(config) if page_fetch else None
+
+    # Cache responses of the short classification-style steps, per node
+    llm_cache_nodes = config.get("llm_cache_nodes", ["initial_response", "search", "decide"]) if config.get("llm_cache_enabled", False) else []
+    llm_cache = LLMResponseCache(
+        path=config.get("llm_cache_path", "llm_cache.db"),
+        ttl=config.get("llm_cache_ttl", 7 * 24 * 3600),
+        max_entries=config.get("llm_cache_max_entries", 5000)
+    ) if llm_cache_nodes else None
+
+    node_llms = {
+        name: CachedChatModel(base_llms[name], llm_cache, **node_model_spec(config, name)) if name in llm_cache_nodes else base_llms[name]
+        for name in NODE_NAMES
+    }
+
+    # Local index for retrieving relevant earlier turns, search results and analyses
+    retrieval_index = RetrievalIndex(config.get("retrieval_index_path", "retrieval_index.jsonl")) if config.get("retrieval_enabled", False) else None
+
+    stream_responses = config.get("stream_responses", True)
+    structured_control = config.get("structured_control", False)
+    speculative_search = config.get("speculative_search", False)
+    title = response_title(config)
+
+    # Per-turn budgets, checked before every further search round
+    governor = TurnGovernor(
+        deadline=config.get("turn_deadline"),
+        max_tokens=config.get("turn_max_tokens"),
+        max_llm_calls=config.get("turn_max_llm_calls"),
+        max_searches=config.get("turn_max_searches", 5)
+    )
+
+    def respond(state):
+        # Arriving here with a search still pending means a budget cut the turn short
+        binding = governor.binding_budget(state) if state["decision"] in ("search", "decide") else None
+        return respond_node({**state, "budget_binding": binding or ""}, node_llms["respond"], stream=stream_responses, panel_title=title)
+
+    def search(state, output=None):
+        return search_node(
+            state,
+            node_llms["search"],
+            fanout=config.get("search_fanout", 1),
+            max_concurrency=config.get("search_max_concurrency", 3),
+            search_timeout=config.get("search_timeout", 10),
+            check_relevance=not structured_control,
+            compact=config.get("search_result_compaction", True),
+            result_token_budget=config.get("search_result_token_budget", 800),
+            result_top_k=config.get("search_result_top_k", 8),
+            max_searches=governor.max_searches,
+            output=output
+        )
+
+    # Create the graph
+    workflow = StateGraph(AgentState)
+
+    # Add nodes
+    if speculative_search:
+        workflow.add_node("initial_response", graph_node("initial_response", lambda state: speculative_initial_response_node(state, node_llms["initial_response"], search, stream=stream_responses)))
+    else:
+        workflow.add_node("initial_response", graph_node("initial_response", lambda state: initial_response_node(state, node_llms["initial_response"], stream=stream_responses)))
+    workflow.add_node("search", graph_node("search", search))
+    if page_fetch:
+        workflow.add_node("fetch", graph_node("fetch", lambda state: fetch_node(
+            state,
+            max_pages=config.get("page_fetch_max_pages", 3),
+            max_passages=config.get("page_fetch_max_passages", 3),
+            token_budget=config.get("page_fetch_token_budget", 1500)
+        )))
+    if structured_control:
+        workflow.add_node("analyze_decide", graph_node("analyze_decide", lambda state: analyze_decide_node(
+            state,
+            node_llms["analyze_decide"],
+            incremental=config.get("incremental_analysis", False)
+        )))
+    else:
+        workflow.add_node("analyze", graph_node("analyze", lambda state: analyze_node(
+            state,
+            node_llms["analyze"],
+            incremental=config.get("incremental_analysis", False),
+            max_analysis_chars=config.get("max_analysis_chars", 4000)
+        )))
+        workflow.add_node("decide", graph_node("decide", lambda state: decide_node(
+            state,
+            node_llms["decide"],
+            respond_threshold=config.get("sufficiency_respond_threshold", 0.8) if config.get("sufficiency_scorer", False) else None,
+            search_threshold=config.get("sufficiency_search_threshold", 0.2),
+            target_results=config.get("sufficiency_target_results", 5),
+            shadow=config.get("sufficiency_shadow", False)
+        )))
+    workflow.add_node("respond", graph_node("respond", respond))
+
+    # Add edges
+    if structured_control:
+        analysis_node = decision_node = "analyze_decide"
+    else:
+        analysis_node, decision_node = "analyze", "decide"
+        # Skip the decide call when no further search round would fit the budgets
+        workflow.add_conditional_edges("analyze", governor.route, {"decide": "decide", "respond": "respond"})
+    if page_fetch:
+        workflow.add_edge("search", "fetch")
+        workflow.add_edge("fetch", analysis_node)
+        after_search = "fetch"
+    else:
+        workflow.add_edge("search", analysis_node)
+        after_search = analysis_node
+    workflow.add_conditional_edges(
+        "initial_response",
+        governor.route,
+        {
+            "search": "search",
+            # The first search already ran speculatively alongside triage
+            "searched": after_search,
+            "respond": "respond"
+        }
+    )
+    workflow.add_conditional_edges(
+        decision_node,
+        governor.route,
+        {
+            "search": "search",
+            "respond": "respond"
+        }
+    )
+    workflow.add_edge("respond", END)
+
+    # Set entry point
+    workflow.set_entry_point("initial_response")
+
+    return {
+        "config": config,
+        "llm": llm,
+        "node_llms": node_llms,
+        "graph": workflow.compile(checkpointer=checkpointer),
+        "respond": respond,
+        "search_cache": search_cache,
+        "search_orchestrator": search_orchestrator,
+        "page_cache": page_cache,
+        "llm_cache": llm_cache,
+        "retrieval_index": retrieval_index,
+        "checkpointer": checkpointer,
+        "governor": governor,
+        "tracer": tracer
+    }
+
+
+def thread_config(agent, thread_id: str = None) -> dict:
+    """Graph run config naming the checkpoint thread of a turn. Empty when checkpointing is off.
+
+    Runs without a registered turn get a throwaway thread id.
+    """
+    if agent["checkpointer"] is None:
+        return {}
+    return {"configurable": {"thread_id": thread_id or uuid.uuid4().hex}}
+
+
+def initial_state(user_input: str, conversation_history: str) -> AgentState:
+    """Build the graph input state for a new user question."""
+    return {
+        "messages": [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=user_input)],
+        "search_results": [],
+        "analysis": "",
+        "search_count": 0,
+        "decision": "initial_response",  # Start with initial response
+        "search_query": user_input,
+        "searched_queries": [],
+        "conversation_history": conversation_history,
+        "streamed": False,
+        "usage": empty_usage(),
+        "budget_binding": ""
+    }
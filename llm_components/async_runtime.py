@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import aiohttp
+
+
+# Long-lived event loop shared by all async work, run on a daemon thread
+_loop = None
+_loop_lock = threading.Lock()
+
+# Pooled HTTP session, bound to the shared loop
+_http_session = None
+
+
+def get_event_loop():
+    """Return the shared background event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="agent-event-loop", daemon=True)
+            thread.start()
+    return _loop
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and block until it finishes."""
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    return future.result(timeout)
+
+
+async def get_http_session():
+    """Return the pooled aiohttp session. Must be awaited on the shared loop."""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300)
+        )
+    return _http_session
+
+
+async def _close_http_session():
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+def shutdown():
+    """Close the pooled HTTP session and stop the shared loop."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(_close_http_session(), _loop).result()
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
@@ -1,153 +1,249 @@
 import json
-from langchain.prompts import ChatPromptTemplate
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from rich.console import Console
 from rich.panel import Panel
-from rich.syntax import Syntax
+from rich.text import Text
 from rich.markdown import Markdown
+from rich.live import Live
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from llm_components.shared import sync_structured_search, AgentState
+from llm_components.shared import sync_structured_search, sync_multi_structured_search, format_token_usage, AgentState, ResearchStep
+from llm_components.progress import pause_progress
+from llm_components.prompts import (
+    INITIAL_RESPONSE_PROMPT, FANOUT_PROMPT, RELEVANCE_PROMPT, ANALYSIS_PROMPT, MERGE_ANALYSIS_PROMPT,
+    DECISION_PROMPT, RESEARCH_STEP_PROMPT, RESPONSE_PROMPT, today
+)
+from llm_components.tracing import record
+from llm_components.result_ranking import INSUFFICIENT_PATTERN, compact_results, format_results, search_failed, sufficiency_score
+from llm_components.search_cache import normalize_query
+from llm_components.page_fetch import enrich_results
+from llm_components.streaming import AnswerPrefixStream, ResponseTagStream, chunk_text, response_panel
 
 # Initialize Rich console for better formatting
 console = Console()
 
-def search_node(state: AgentState, llm) -> AgentState:
-    """Perform a web search based on the search query."""
-    if state["search_count"] < 5:
+# Runs speculative first searches alongside the initial triage
+_speculation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-search")
+
+def search_node(state: AgentState, llm, fanout: int = 1, max_concurrency: int = 3, search_timeout: float = 10.0, check_relevance: bool = True,
+                compact: bool = True, result_token_budget: int = 800, result_top_k: int = 8, max_searches: int = 5,
+                output: list = None) -> AgentState:
+    """Perform a web search based on the search query.
+
+    With fanout > 1 the relevance check proposes several query variants,
+    which are searched concurrently and merged into one result batch.
+    With check_relevance=False the query is searched as given.
+    With compact=True the batch is deduplicated against earlier rounds,
+    ranked against the question and trimmed to result_token_budget.
+    Console output is collected into `output` instead, when given.
+    """
+    show = console.print if output is None else output.append
+    if state["search_count"] < max_searches:
         search_query = state["search_query"] if state["search_query"] else state["messages"][-1].content
+        requested_query = search_query
+        conversation_history = state["conversation_history"]
         
-        # Double-check relevance
-        relevance_prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an AI assistant tasked with ensuring search queries are relevant to the user's question and conversation context."),
-            ("human", """User's question: {last_message}
-Conversation context: {conversation_history}
-Proposed search query: {search_query}
-
-Is this search query relevant and specific to the user's question and conversation context? If not, provide a more relevant query. todays date is September 30, 2024 Respond with either:
-1. 'RELEVANT: [original query]' if the query is good.
-2. 'UPDATED: [new query]' if you have a better, more relevant query.""")
-        ])
-        relevance_chain = relevance_prompt | llm
-        relevance_check = relevance_chain.invoke({
-            "last_message": state["messages"][-1].content,
-            "conversation_history": "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in state["memory"].get("messages", [])]),
-            "search_query": search_query
-        })
-        
-        relevance_content = relevance_check.content.strip()
-        if relevance_content.startswith("UPDATED:"):
-            search_query = relevance_content[8:].strip()
-            console.print(f"[bold yellow]Updated search query:[/bold yellow] {search_query}")
-        
-        search_results = sync_structured_search(search_query)
-        console.print(Panel(Syntax(search_results, "json", theme="monokai", line_numbers=True), title=f"Search Results (Attempt {state['search_count'] + 1})", expand=False))
+        if fanout > 1:
+            fanout_chain = FANOUT_PROMPT | llm
+            fanout_response = fanout_chain.invoke({
+                "last_message": state["messages"][-1].content,
+                "conversation_history": conversation_history,
+                "search_query": search_query,
+                "fanout": fanout,
+                "date": today()
+            })
+            queries = [line.strip()[6:].strip() for line in fanout_response.content.splitlines() if line.strip().upper().startswith("QUERY:")]
+            queries = [query for query in queries if query][:fanout] or [search_query]
+            show(f"[bold yellow]Searching concurrently:[/bold yellow] {'; '.join(queries)}")
+            search_results = sync_multi_structured_search(queries, max_concurrency=max_concurrency, timeout=search_timeout)
+        elif not check_relevance:
+            search_results = sync_structured_search(search_query, timeout=search_timeout)
+        else:
+            # Double-check relevance
+            relevance_chain = RELEVANCE_PROMPT | llm
+            relevance_check = relevance_chain.invoke({
+                "last_message": state["messages"][-1].content,
+                "conversation_history": conversation_history,
+                "search_query": search_query,
+                "date": today()
+            })
+            
+            relevance_content = relevance_check.content.strip()
+            if relevance_content.startswith("UPDATED:"):
+                search_query = relevance_content[8:].strip()
+                show(f"[bold yellow]Updated search query:[/bold yellow] {search_query}")
+            
+            search_results = sync_structured_search(search_query, timeout=search_timeout)
+        if compact:
+            search_results = compact_results(
+                search_results,
+                f"{state['messages'][-1].content} {search_query}",
+                previous_batches=state["search_results"],
+                token_budget=result_token_budget,
+                top_k=result_top_k
+            )
+        show(Panel(Text(format_results([search_results])), title=f"Search Results (Attempt {state['search_count'] + 1})", expand=False))
         return {
             **state,
             "search_results": state["search_results"] + [search_results],
             "search_count": state["search_count"] + 1,
-            "search_query": ""  # Reset the search query after using it
+            "search_query": "",  # Reset the search query after using it
+            "searched_queries": state["searched_queries"] + [requested_query]
         }
     return {**state, "decision": "respond"}  # Force respond if max searches reached
 
-def analyze_node(state: AgentState, llm) -> AgentState:
-    """Analyze the search results."""
-    analysis_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an AI assistant tasked with analyzing search results. Provide a concise summary of the key points. If the information is insufficient or irrelevant, clearly state so and explain why. If you encounter any errors or inconsistencies in the search results, report them explicitly."""),
-        ("human", "Analyze the following search results:\n{search_results}")
-    ])
-    analysis_chain = analysis_prompt | llm
-    analysis = analysis_chain.invoke({"search_results": json.dumps(state["search_results"])})
-    console.print(Panel(Markdown(analysis.content), title="Analysis", expand=False))
-    return {**state, "analysis": analysis.content, "decision": "decide"}  # Set next decision to 'decide'
-
-def decide_node(state: AgentState, llm) -> AgentState:
-    """Decide whether to search again or proceed to respond."""
-    decision_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an AI assistant tasked with deciding whether the current information is sufficient to answer the user's question or if more searching is needed. Consider the conversation history and previous answers when making your decision.
-
-If more searching is needed, formulate a specific and relevant search query based on the user's question and the current context of the conversation. The search query should be directly related to finding the requested information.
-
-Your response should be in one of these formats:
-1. 'SEARCH: [specific search query]' if more information is needed.
-2. 'RESPOND' if the information is sufficient to answer the question accurately."""),
-        ("human", """Based on this analysis: {analysis}
-
-And the user's question: {last_message}
-
-Consider the search count: {search_count}
-
-Previous conversation:
-{conversation_history}
-
-Your response should be in one of these formats:
-1. 'SEARCH: [specific search query]' if more information is needed.
-2. 'RESPOND' if the information is sufficient to answer the question accurately.
-         
-          If we need to search, what specific information should we look for? Ensure the search query is directly relevant to the user's question and the conversation context.""")
-    ])
-    decision_chain = decision_prompt | llm
-    last_human_message = next((msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)), None)
+def fetch_node(state: AgentState, max_pages: int = 3, max_passages: int = 3, token_budget: int = 1500) -> AgentState:
+    """Fetch the top result pages of the latest search and attach their most relevant passages."""
+    if not state["search_results"]:
+        return state
+    enriched = enrich_results(
+        state["search_results"][-1],
+        state["messages"][-1].content,
+        max_pages=max_pages,
+        max_passages=max_passages,
+        token_budget=token_budget
+    )
+    fetched = sum(1 for item in json.loads(enriched) if item.get("content"))
+    console.print(f"[bold yellow]Read {fetched} of the top {max_pages} result pages[/bold yellow]")
+    return {**state, "search_results": state["search_results"][:-1] + [enriched]}
+
+def analyze_node(state: AgentState, llm, incremental: bool = False, max_analysis_chars: int = 4000) -> AgentState:
+    """Analyze the search results.
+
+    In incremental mode only the newest result batch is analyzed and folded
+    into the running analysis, which is kept under max_analysis_chars.
+    """
+    if incremental and state["analysis"]:
+        analysis_chain = MERGE_ANALYSIS_PROMPT | llm
+        analysis = analysis_chain.invoke({
+            "analysis": state["analysis"],
+            "search_results": format_results(state["search_results"][-1:]),
+            "max_words": max_analysis_chars // 6
+        })
+    elif incremental:
+        analysis_chain = ANALYSIS_PROMPT | llm
+        analysis = analysis_chain.invoke({
+            "search_results": format_results(state["search_results"][-1:]),
+            "length_limit": f" in under {max_analysis_chars // 6} words"
+        })
+    else:
+        analysis_chain = ANALYSIS_PROMPT | llm
+        analysis = analysis_chain.invoke({"search_results": format_results(state["search_results"]), "length_limit": ""})
     
-    conversation_history = "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in state["memory"].get("messages", [])])
+    analysis_content = analysis.content
+    if incremental and len(analysis_content) > max_analysis_chars:
+        analysis_content = analysis_content[:max_analysis_chars].rsplit("\n", 1)[0]
+    console.print(Panel(Markdown(analysis_content), title="Analysis", subtitle=format_token_usage(analysis), expand=False))
+    return {**state, "analysis": analysis_content, "decision": "decide"}  # Set next decision to 'decide'
+
+def scored_decision(state: AgentState, question: str, respond_threshold: float, search_threshold: float, target_results: int = 5):
+    """Decide locally from result coverage, returning (decision, search_query), or None when unsure."""
+    score = sufficiency_score(question, state["search_results"], target_results)
+    if score >= respond_threshold and not INSUFFICIENT_PATTERN.search(state["analysis"]):
+        return "respond", ""
+    if score <= search_threshold:
+        # Retry with the question itself, unless it was already searched this turn
+        if normalize_query(question) not in {normalize_query(query) for query in state["searched_queries"]}:
+            return "search", question
+        # Every search so far failed, so search is unavailable; answer with what the analysis reports
+        if search_failed(state["search_results"]):
+            return "respond", ""
+    return None
+
+def decide_node(state: AgentState, llm, respond_threshold: float = None, search_threshold: float = 0.2,
+                target_results: int = 5, shadow: bool = False) -> AgentState:
+    """Decide whether to search again or proceed to respond.
+
+    With respond_threshold set, clear-cut cases are decided by the local
+    sufficiency scorer without an LLM call. With shadow=True the LLM still
+    decides and the scorer's verdicts are only counted against it.
+    """
+    last_human_message = next((msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)), None)
+    question = last_human_message.content if last_human_message else "No message found."
+
+    verdict = scored_decision(state, question, respond_threshold, search_threshold, target_results) if respond_threshold is not None else None
+    if verdict is not None and not shadow:
+        record("sufficiency_skips")
+        decision, new_query = verdict
+        if decision == "search":
+            console.print(f"[bold cyan]Searching for:[/bold cyan] {new_query}")
+            return {**state, "decision": "search", "search_query": new_query}
+        return {**state, "decision": "respond"}
+
+    decision_chain = DECISION_PROMPT | llm
+    conversation_history = state["conversation_history"]
     
     decision = decision_chain.invoke({
         "analysis": state["analysis"],
-        "last_message": last_human_message.content if last_human_message else "No message found.",
+        "last_message": question,
         "search_count": state["search_count"],
         "conversation_history": conversation_history
     })
     decision_content = decision.content.strip().upper()
-    if decision_content.startswith("SEARCH:") and state["search_count"] < 5:
+    if decision_content.startswith("SEARCH:"):
         new_query = decision_content[7:].strip()
-        console.print(f"[bold cyan]Searching for:[/bold cyan] {new_query}")
-        return {**state, "decision": "search", "search_query": new_query}
+        result = {**state, "decision": "search", "search_query": new_query}
     else:
-        return {**state, "decision": "respond"}
+        result = {**state, "decision": "respond"}
+    if verdict is not None:
+        record("sufficiency_checks")
+        if verdict[0] == result["decision"]:
+            record("sufficiency_agreements")
+    if result["decision"] == "search":
+        console.print(f"[bold cyan]Searching for:[/bold cyan] {new_query}")
+    return result
+
+def analyze_decide_node(state: AgentState, llm, incremental: bool = False) -> AgentState:
+    """Analyze the search results and decide whether to search again, in one structured-output call.
 
-def respond_node(state: AgentState, llm) -> AgentState:
-    """Generate a response based on the analysis, conversation history, and memory."""
-    response_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an AI assistant tasked with providing precise and relevant information based on web search results and past interactions. Your responses should be:
-1. Directly relevant to the user's question
-2. Concise yet comprehensive
-3. Well-structured and easy to read
-4. Backed by the information from the search results and past interactions
-
-When providing information:
-- Always provide up-to-date info. Today is September 30, 2024.
-- If you encounter any errors or inconsistencies in the search results or analysis, report them explicitly to the user.
-- If you're unsure about any information or if the search results are inadequate, state so clearly.
-- Avoid mixing unrelated topics unless they are directly relevant to the user's query.
-
-Consider the following memory of past interactions when formulating your response:
-{memory}
-
-Enclose your response between <response> tags."""),
-        ("human", """Based on this analysis: 
-<analysis>
-{analysis}
-</analysis>
-
-And considering the conversation history and memory:
-{conversation_history}
-
-Respond to the user's last message: 
-<user_message>
-{last_message}
-</user_message>
-
-Provide your response below:""")
-    ])
-    response_chain = response_prompt | llm
+    Replaces the separate analyze and decide steps, and the relevance check
+    before the next search, with a single ResearchStep tool call.
+    """
+    research_chain = RESEARCH_STEP_PROMPT | llm.with_structured_output(ResearchStep)
     last_human_message = next((msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)), None)
     
-    conversation_history = "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in state["memory"].get("messages", [])])
+    step = research_chain.invoke({
+        "last_message": last_human_message.content if last_human_message else "No message found.",
+        "conversation_history": state["conversation_history"],
+        "search_count": state["search_count"],
+        "analysis": state["analysis"] if incremental and state["analysis"] else "None",
+        "search_results": format_results(state["search_results"][-1:] if incremental else state["search_results"]),
+        "date": today()
+    })
+    console.print(Panel(Markdown(step.analysis), title="Analysis", expand=False))
+    
+    if not step.sufficient and step.next_search and step.next_search.query.strip():
+        new_query = step.next_search.query.strip()
+        console.print(f"[bold cyan]Searching for:[/bold cyan] {new_query}")
+        return {**state, "analysis": step.analysis, "decision": "search", "search_query": new_query}
+    return {**state, "analysis": step.analysis, "decision": "respond"}
+
+def respond_node(state: AgentState, llm, stream: bool = False, panel_title: str = "AI Assistant Response") -> AgentState:
+    """Generate a response based on the analysis, conversation history, and memory.
+
+    With stream=True the response is rendered in a live panel as tokens arrive.
+    """
+    response_chain = RESPONSE_PROMPT | llm
+    last_human_message = next((msg for msg in reversed(state["messages"]) if isinstance(msg, HumanMessage)), None)
     
-    response = response_chain.invoke({
+    inputs = {
         "analysis": state["analysis"],
-        "memory": json.dumps(state["memory"]),
-        "conversation_history": conversation_history,
-        "last_message": last_human_message.content if last_human_message else "No message found."
-    })
+        "conversation_history": state["conversation_history"],
+        "last_message": last_human_message.content if last_human_message else "No message found.",
+        "date": today()
+    }
+    
+    if stream:
+        parser = ResponseTagStream()
+        pause_progress()
+        console.print("\n")
+        with Live(response_panel("", panel_title), console=console, refresh_per_second=12) as live:
+            for chunk in response_chain.stream(inputs):
+                live.update(response_panel(parser.feed(chunk_text(chunk)), panel_title))
+        formatted_response = parser.visible_text()
+        return {**state, "messages": [*state["messages"], AIMessage(content=formatted_response)], "streamed": True}
+    
+    response = response_chain.invoke(inputs)
     
     import re
     response_content = re.search(r'<response>(.*?)</response>', response.content, re.DOTALL)
@@ -158,20 +254,33 @@ Provide your response below:""")
     
     return {**state, "messages": [*state["messages"], AIMessage(content=formatted_response)]}
 
-def initial_response_node(state: AgentState, llm) -> AgentState:
-    """Attempt to answer the question without searching."""
-    initial_response_prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an AI assistant with broad knowledge. Attempt to answer the user's question based on your existing knowledge. If you can confidently answer the question, do so. If you need more information or are unsure, admit that you need to search for more details.
-
-Your response should be in one of these formats:
-1. 'ANSWER: [your confident answer]' if you can answer without additional search.
-2. 'SEARCH_NEEDED' if you need more information to provide an accurate answer.
+def initial_response_node(state: AgentState, llm, stream: bool = False) -> AgentState:
+    """Attempt to answer the question without searching.
 
-Today's date is September 30, 2024."""),
-        ("human", "{question}")
-    ])
-    initial_response_chain = initial_response_prompt | llm
-    response = initial_response_chain.invoke({"question": state["messages"][-1].content})
+    With stream=True a confident answer is rendered in a live panel as tokens
+    arrive, and generation stops as soon as the reply is known not to be one.
+    """
+    initial_response_chain = INITIAL_RESPONSE_PROMPT | llm
+    
+    if stream:
+        parser = AnswerPrefixStream()
+        chunks = initial_response_chain.stream({"question": state["messages"][-1].content, "date": today()})
+        for chunk in chunks:
+            parser.feed(chunk_text(chunk))
+            if parser.is_answer is not None:
+                break
+        if parser.is_answer:
+            pause_progress()
+            with Live(Panel(Markdown(parser.answer_text()), title="Initial Response", expand=False), console=console, refresh_per_second=12) as live:
+                for chunk in chunks:
+                    live.update(Panel(Markdown(parser.feed(chunk_text(chunk))), title="Initial Response", expand=False))
+            answer = parser.answer_text()
+            return {**state, "messages": [*state["messages"], AIMessage(content=answer)], "decision": "respond"}
+        chunks.close()
+        console.print("[bold yellow]Initial response: More information needed. Proceeding to search.[/bold yellow]")
+        return {**state, "decision": "search"}
+    
+    response = initial_response_chain.invoke({"question": state["messages"][-1].content, "date": today()})
     
     response_content = response.content.strip()
     if response_content.startswith("ANSWER:"):
@@ -180,4 +289,37 @@ Today's date is September 30, 2024."""),
         return {**state, "messages": [*state["messages"], AIMessage(content=answer)], "decision": "respond"}
     else:
         console.print("[bold yellow]Initial response: More information needed. Proceeding to search.[/bold yellow]")
-        return {**state, "decision": "search"}
\ No newline at end of file
+        return {**state, "decision": "search"}
+
+def speculative_initial_response_node(state: AgentState, llm, search, stream: bool = False) -> AgentState:
+    """Run the initial triage and the first search (with its relevance check) concurrently.
+
+    `search` is the configured search node; its console output is held back
+    until the triage result is known. If triage answers directly, the search
+    is cancelled, or discarded if it already started. Otherwise its results
+    are used and the decision is 'searched', so the graph skips the search node.
+    """
+    output = []
+    # Copy the context so the search's spans and counters nest under this node
+    speculation = _speculation_executor.submit(copy_context().run, search, state, output)
+    record("speculative_searches")
+    result = initial_response_node(state, llm, stream=stream)
+    if result["decision"] == "respond":
+        speculation.cancel()
+        return result
+    try:
+        searched = speculation.result()
+    except Exception as e:
+        console.print(f"[bold yellow]Speculative search failed ({type(e).__name__}); searching again.[/bold yellow]")
+        return result
+    record("speculation_hits")
+    for renderable in output:
+        console.print(renderable)
+    return {
+        **result,
+        "search_results": searched["search_results"],
+        "search_count": searched["search_count"],
+        "search_query": searched["search_query"],
+        "searched_queries": searched["searched_queries"],
+        "decision": "searched"
+    }
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import time
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+from llm_components.sqlite_cache import SQLiteCache
+from llm_components.tracing import record
+
+
+class LLMResponseCache(SQLiteCache):
+    """SQLite-backed cache of LLM responses with per-entry TTL and LRU eviction.
+
+    Each entry remembers how long the original call took, so hits can report
+    the latency they saved.
+    """
+
+    table = "llm_cache"
+    columns = ("value TEXT NOT NULL", "latency REAL NOT NULL")
+
+    def __init__(self, path: str = "llm_cache.db", ttl: float = 7 * 24 * 3600, max_entries: int = 5000):
+        super().__init__(path, ttl, max_entries)
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str) -> str:
+        return hashlib.sha256(json.dumps([provider, model, prompt]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached response text, or None if missing or expired."""
+        entry, _ = self._read(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.saved_seconds += entry["latency"]
+        return entry["value"]
+
+    def set(self, key: str, value: str, latency: float):
+        """Store a response and evict the least recently used entries over the size limit."""
+        self._write(key, {"value": value, "latency": latency})
+
+    def stats(self) -> dict:
+        return {**super().stats(), "saved_seconds": self.saved_seconds}
+
+
+class CachedChatModel(Runnable):
+    """Wraps a chat model so identical rendered prompts are answered from the cache.
+
+    Streaming is not passed through: a miss is generated in one call and
+    yielded as a single chunk, so every completed response can be cached.
+    Structured output is cached as the schema instance's JSON.
+    """
+
+    def __init__(self, llm, cache: LLMResponseCache, provider: str, model: str, schema=None):
+        self.llm = llm
+        self.cache = cache
+        self.provider = provider
+        self.model = model
+        self.schema = schema
+
+    def with_structured_output(self, schema, **kwargs) -> Runnable:
+        return CachedChatModel(self.llm.with_structured_output(schema, **kwargs), self.cache, self.provider, self.model, schema=schema)
+
+    def _cache_key(self, input) -> str:
+        if hasattr(input, "to_messages"):
+            prompt = json.dumps([[message.type, message.content] for message in input.to_messages()])
+        else:
+            prompt = str(input)
+        if self.schema is not None:
+            prompt = json.dumps([self.schema.__name__, prompt])
+        return self.cache.make_key(self.provider, self.model, prompt)
+
+    def invoke(self, input, config=None, **kwargs):
+        key = self._cache_key(input)
+        cached = self.cache.get(key)
+        if cached is not None:
+            record("cache_hits")
+            if self.schema is not None:
+                return self.schema.model_validate_json(cached)
+            return AIMessage(content=cached, response_metadata={"cache_hit": True})
+        started = time.monotonic()
+        response = self.llm.invoke(input, config, **kwargs)
+        if self.schema is not None and isinstance(response, self.schema):
+            self.cache.set(key, response.model_dump_json(), time.monotonic() - started)
+        elif self.schema is None and isinstance(response.content, str):
+            self.cache.set(key, response.content, time.monotonic() - started)
+        return response
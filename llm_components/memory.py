@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from llm_components.prompts import SUMMARY_PROMPT
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, assuming about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def format_messages(messages) -> str:
+    return "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in messages])
+
+
+class ConversationMemory:
+    """Conversation memory bounded by a token budget.
+
+    Recent messages are kept verbatim. Once they exceed the budget, the oldest
+    ones are folded into a rolling summary by the LLM on a background thread.
+    Messages waiting to be summarized are still rendered verbatim, so nothing
+    is dropped in the meantime.
+    """
+
+    def __init__(self, llm, token_budget: int = 2000, min_recent_messages: int = 2):
+        self.llm = llm
+        self.token_budget = token_budget
+        self.min_recent_messages = min_recent_messages
+        self.summary = ""
+        self.recent = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+        self._summarizing = False
+        self._rendered = None
+
+    def add(self, role: str, content: str):
+        """Record a message and schedule summarization if over budget."""
+        with self._lock:
+            self.recent.append({"role": role, "content": content})
+            self._rendered = None
+            while (len(self.recent) > self.min_recent_messages
+                   and estimate_tokens(format_messages(self.recent)) > self.token_budget):
+                self._pending.append(self.recent.pop(0))
+            if self._pending and not self._summarizing:
+                self._summarizing = True
+                self._executor.submit(self._summarize)
+
+    def discard_last(self, role: str):
+        """Drop the latest message if it is from `role`, e.g. a question whose turn failed."""
+        with self._lock:
+            if self.recent and self.recent[-1]["role"] == role:
+                self.recent.pop()
+                self._rendered = None
+
+    def _summarize(self):
+        summary_chain = SUMMARY_PROMPT | self.llm
+        while True:
+            with self._lock:
+                pending = list(self._pending)
+                summary = self.summary
+            if not pending:
+                break
+            try:
+                response = summary_chain.invoke({
+                    "summary": summary or "(empty)",
+                    "messages": format_messages(pending),
+                    "max_words": max(self.token_budget // 4, 50)
+                })
+            except Exception:
+                break
+            with self._lock:
+                self.summary = response.content.strip()
+                del self._pending[:len(pending)]
+                self._rendered = None
+        with self._lock:
+            self._summarizing = False
+
+    def render(self) -> str:
+        """Render the history for prompts. Cached until the memory changes."""
+        with self._lock:
+            if self._rendered is None:
+                parts = []
+                if self.summary:
+                    parts.append(f"Summary of earlier conversation: {self.summary}")
+                if self._pending or self.recent:
+                    parts.append(format_messages(self._pending + self.recent))
+                self._rendered = "\n\n".join(parts)
+            return self._rendered
+
+    def render_recent(self, max_messages: int) -> str:
+        """Render only the latest messages verbatim, without the summary of earlier ones."""
+        with self._lock:
+            return format_messages((self._pending + self.recent)[-max_messages:])
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import time
+from html.parser import HTMLParser
+from typing import Dict, List
+from urllib.parse import urlsplit
+import aiohttp
+from llm_components.async_runtime import get_http_session, run_sync
+from llm_components.memory import estimate_tokens
+from llm_components.result_ranking import bm25_scores
+from llm_components.sqlite_cache import SQLiteCache
+from llm_components.tracing import record, span
+
+
+# Elements whose text is page chrome or code rather than content
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe", "button"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "td", "th", "br",
+              "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt"}
+MAIN_TAGS = {"article", "main"}
+
+
+class PageCache(SQLiteCache):
+    """SQLite-backed cache of extracted page text with per-entry TTL and LRU eviction.
+
+    Expired entries are kept with their ETag and Last-Modified validators, so
+    the next fetch can be a conditional request that costs no body download.
+    """
+
+    table = "page_cache"
+    key_column = "url"
+    columns = ("title TEXT NOT NULL", "text TEXT NOT NULL", "etag TEXT", "last_modified TEXT")
+
+    def __init__(self, path: str = "page_cache.db", ttl: float = 24 * 3600, max_entries: int = 500):
+        super().__init__(path, ttl, max_entries)
+        self.revalidated = 0
+
+    def get(self, url: str):
+        """Return (entry, fresh) for a cached page, or (None, False) if it was never cached."""
+        return self._read(url, keep_expired=True)
+
+    def set(self, url: str, title: str, text: str, etag: str = None, last_modified: str = None):
+        """Store a page and evict the least recently used entries over the size limit."""
+        self._write(url, {"title": title, "text": text, "etag": etag, "last_modified": last_modified}, keep_expired=True)
+
+    def touch(self, url: str):
+        """Extend the lifetime of an entry the server confirmed is unchanged."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE page_cache SET expires_at = ?, last_access = ? WHERE url = ?", (now + self.ttl, now, url))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            "entries": self.entries()
+        }
+
+
+class TextExtractor(HTMLParser):
+    """Collect the readable text of an HTML page, preferring its <article> or <main> element."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.blocks = []
+        self.main_blocks = []
+        self._current = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS and self._main_depth:
+            self._main_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def _flush(self):
+        text = " ".join("".join(self._current).split())
+        self._current = []
+        if text:
+            self.blocks.append(text)
+            if self._main_depth:
+                self.main_blocks.append(text)
+
+    def text(self) -> str:
+        self._flush()
+        return "\n".join(self.main_blocks or self.blocks)
+
+
+def extract_main_text(html: str) -> tuple:
+    """Return the title and main text of an HTML page."""
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return " ".join(extractor.title.split()), extractor.text()
+
+
+def split_passages(text: str, passage_words: int = 120, overlap: int = 20) -> List[str]:
+    """Split text into overlapping passages of about `passage_words` words."""
+    words = text.split()
+    if len(words) <= passage_words:
+        return [" ".join(words)] if words else []
+    step = max(1, passage_words - overlap)
+    return [" ".join(words[start:start + passage_words]) for start in range(0, len(words) - overlap, step)]
+
+
+def top_passages(text: str, question: str, max_passages: int = 3) -> List[str]:
+    """The passages of a page that best match the question, in page order."""
+    passages = split_passages(text)
+    scores = bm25_scores(question, passages)
+    best = sorted(range(len(passages)), key=lambda i: -scores[i])[:max_passages]
+    return [passages[i] for i in sorted(best)]
+
+
+# Page cache and fetch limits, set up by configure_page_fetch()
+page_cache = None
+fetch_timeout = 8.0
+per_host_limit = 2
+max_page_bytes = 2_000_000
+
+# Per-host semaphores, created on the shared loop
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+def configure_page_fetch(config):
+    """Set up the page cache and fetch limits from the agent configuration."""
+    global page_cache, fetch_timeout, per_host_limit, max_page_bytes
+    fetch_timeout = config.get("page_fetch_timeout", 8.0)
+    per_host_limit = config.get("page_fetch_per_host", 2)
+    max_page_bytes = config.get("page_fetch_max_bytes", 2_000_000)
+    if config.get("page_cache_enabled", True):
+        page_cache = PageCache(
+            path=config.get("page_cache_path", "page_cache.db"),
+            ttl=config.get("page_cache_ttl", 24 * 3600),
+            max_entries=config.get("page_cache_max_entries", 500)
+        )
+    else:
+        page_cache = None
+    return page_cache
+
+
+async def fetch_page(url: str) -> dict:
+    """Fetch a page and extract its text, revalidating cached copies with their ETag or Last-Modified."""
+    with span("fetch_page", url=url):
+        cached, fresh = page_cache.get(url) if page_cache is not None else (None, False)
+        if fresh:
+            page_cache.hits += 1
+            record("cache_hits")
+            return {"url": url, "title": cached["title"], "text": cached["text"]}
+
+        headers = {"User-Agent": "terminal-agent/1.0", "Accept": "text/html,text/plain"}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = urlsplit(url).netloc.lower()
+        limit = _host_limits.setdefault(host, asyncio.Semaphore(per_host_limit))
+        session = await get_http_session()
+        try:
+            async with limit:
+                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=fetch_timeout)) as response:
+                    if response.status == 304 and cached:
+                        page_cache.touch(url)
+                        page_cache.revalidated += 1
+                        record("cache_hits")
+                        return {"url": url, "title": cached["title"], "text": cached["text"]}
+                    if not response.ok:
+                        return {"url": url, "error": f"HTTP {response.status}"}
+                    content_type = response.headers.get("Content-Type", "")
+                    if content_type and not content_type.startswith(("text/html", "text/plain", "application/xhtml")):
+                        return {"url": url, "error": f"Unsupported content type {content_type}"}
+                    body = await response.content.read(max_page_bytes)
+                    html = body.decode(response.charset or "utf-8", errors="replace")
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+        except asyncio.TimeoutError:
+            return {"url": url, "error": f"Fetch timed out after {fetch_timeout}s"}
+        except aiohttp.ClientError as e:
+            return {"url": url, "error": f"Fetch error: {e}"}
+
+        if content_type.startswith("text/plain"):
+            title, text = "", html
+        else:
+            title, text = extract_main_text(html)
+        if page_cache is not None:
+            page_cache.misses += 1
+            page_cache.set(url, title, text, etag=etag, last_modified=last_modified)
+        return {"url": url, "title": title, "text": text}
+
+
+async def fetch_pages(urls: List[str]) -> List[dict]:
+    """Fetch pages concurrently; failures are returned as entries with an error."""
+    return await asyncio.gather(*(fetch_page(url) for url in urls))
+
+
+def enrich_results(batch: str, question: str, max_pages: int = 3, max_passages: int = 3, token_budget: int = 1500) -> str:
+    """Add the passages most relevant to the question from the top result pages to a result batch.
+
+    Passages are attached as a `content` field on each fetched result and
+    stop once roughly `token_budget` tokens have been added.
+    """
+    items = json.loads(batch)
+    targets = [item for item in items if isinstance(item, dict) and item.get("link")][:max_pages]
+    if not targets:
+        return batch
+    pages = run_sync(fetch_pages([item["link"] for item in targets]))
+    used_tokens = 0
+    for item, page in zip(targets, pages):
+        if page.get("error") or not page.get("text"):
+            continue
+        passages = []
+        for passage in top_passages(page["text"], question, max_passages):
+            passage_tokens = estimate_tokens(passage)
+            if used_tokens + passage_tokens > token_budget:
+                break
+            passages.append(passage)
+            used_tokens += passage_tokens
+        if passages:
+            item["content"] = "\n...\n".join(passages)
+    return json.dumps(items)
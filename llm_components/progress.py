@@ -0,0 +1,89 @@
+import time
+from rich.live import Live
+from rich.spinner import Spinner
+
+
+NODE_LABELS = {
+    "initial_response": "Thinking",
+    "search": "Searching the web",
+    "fetch": "Reading result pages",
+    "analyze": "Analyzing results",
+    "decide": "Deciding next step",
+    "analyze_decide": "Analyzing results",
+    "respond": "Writing response"
+}
+
+# Progress display of the running turn, if any
+active_progress = None
+
+
+class NodeProgress:
+    """Spinner showing the running graph node and the elapsed turn time.
+
+    Rich refreshes the display on its own thread, so it keeps updating while
+    the graph runs. Nodes that render their own live output call
+    pause_progress() first; the spinner resumes at the next node.
+    """
+
+    def __init__(self, console):
+        self.console = console
+        self.node = None
+        self._started = None
+        self._live = None
+        self._finished = False
+
+    def __rich__(self):
+        elapsed = time.monotonic() - self._started
+        label = NODE_LABELS.get(self.node, "Processing")
+        return Spinner("dots", text=f"{label}... [dim]{elapsed:.1f}s[/dim]")
+
+    def start(self):
+        global active_progress
+        active_progress = self
+        self._started = time.monotonic()
+        self._finished = False
+        self._resume()
+        return self
+
+    def set_node(self, node: str):
+        self.node = node
+        if not self._finished:
+            self._resume()
+
+    def pause(self):
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def stop(self):
+        global active_progress
+        self._finished = True
+        self.pause()
+        if active_progress is self:
+            active_progress = None
+
+    def _resume(self):
+        if self._live is None:
+            self._live = Live(self, console=self.console, refresh_per_second=10, transient=True)
+            self._live.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def pause_progress():
+    """Hide the active progress spinner so a node can render its own live output."""
+    if active_progress is not None:
+        active_progress.pause()
+
+
+def tracked_node(name: str, node):
+    """Wrap a graph node so the active progress display shows it while it runs."""
+    def run(state):
+        if active_progress is not None:
+            active_progress.set_node(name)
+        return node(state)
+    return run
@@ -0,0 +1,25 @@
+from langchain_anthropic import ChatAnthropic
+
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+class PromptCachingChatAnthropic(ChatAnthropic):
+    """ChatAnthropic that marks the end of the system prompt as a prompt-cache breakpoint.
+
+    The node system prompts are static (see prompts.py), so repeated calls
+    can read the tool definitions and system prompt from Anthropic's cache
+    instead of reprocessing them. Anthropic only caches prefixes of at least
+    1024 tokens (2048 for Haiku models); the current node prompts are a few
+    hundred tokens, so caching stays inert until they grow past that, and
+    such short prefixes are processed and billed normally.
+    """
+
+    def _get_request_payload(self, input_, *, stop=None, **kwargs) -> dict:
+        payload = super()._get_request_payload(input_, stop=stop, **kwargs)
+        system = payload.get("system")
+        if isinstance(system, str) and system:
+            payload["system"] = [{"type": "text", "text": system, "cache_control": CACHE_CONTROL}]
+        elif isinstance(system, list) and system and isinstance(system[-1], dict) and "cache_control" not in system[-1]:
+            payload["system"] = [*system[:-1], {**system[-1], "cache_control": CACHE_CONTROL}]
+        return payload
@@ -0,0 +1,211 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from langchain_core.runnables import Runnable
+from llm_components.tracing import record
+
+
+# HTTP statuses worth retrying: rate limits, overload and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_NAMES = ("RateLimit", "Timeout", "APIConnection", "Connection", "Overloaded", "InternalServer", "ServiceUnavailable")
+
+# Process-wide totals across all wrapped models, see metrics()
+_metrics = {"calls": 0, "retries": 0, "failures": 0, "hedges": 0, "hedge_wins": 0, "throttled_seconds": 0.0}
+_metrics_lock = threading.Lock()
+
+
+def _count(name: str, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def metrics() -> dict:
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def reset_metrics():
+    with _metrics_lock:
+        for name in _metrics:
+            _metrics[name] = 0
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an LLM client error is transient: a rate limit, timeout, connection or server error."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return isinstance(error, (TimeoutError, ConnectionError)) or any(name in type(error).__name__ for name in RETRYABLE_ERROR_NAMES)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts of `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+# One bucket per provider, shared by every model on that provider's account
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, rate: float, capacity: float = None) -> TokenBucket:
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = TokenBucket(rate, capacity)
+        return _rate_limiters[provider]
+
+
+# Threads running hedged duplicate requests
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+
+class ResilientChatModel(Runnable):
+    """Wraps a chat model with rate limiting, jittered exponential retries and hedged requests.
+
+    Retryable errors are retried up to `max_retries` times with full-jitter
+    backoff. With `hedge` enabled, an invoke that runs longer than the p95 of
+    recent call latencies starts one duplicate request and returns whichever
+    finishes first. Streams are retried only until their first chunk and are
+    never hedged.
+    """
+
+    def __init__(self, llm, rate_limiter: TokenBucket = None, max_retries: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, hedge: bool = False, hedge_percentile: float = 0.95,
+                 hedge_min_samples: int = 10, latencies: deque = None):
+        self.llm = llm
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = latencies if latencies is not None else deque(maxlen=200)
+
+    def with_structured_output(self, schema, **kwargs) -> Runnable:
+        return ResilientChatModel(
+            self.llm.with_structured_output(schema, **kwargs),
+            rate_limiter=self.rate_limiter,
+            max_retries=self.max_retries,
+            base_delay=self.base_delay,
+            max_delay=self.max_delay,
+            hedge=self.hedge,
+            hedge_percentile=self.hedge_percentile,
+            hedge_min_samples=self.hedge_min_samples,
+            latencies=self.latencies
+        )
+
+    def _throttle(self):
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire()
+            if waited:
+                _count("throttled_seconds", waited)
+
+    def _backoff(self, attempt: int):
+        record("retries")
+        _count("retries")
+        time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    def _hedge_delay(self):
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile))]
+
+    def _call(self, input, config, **kwargs):
+        self._throttle()
+        started = time.monotonic()
+        result = self.llm.invoke(input, config, **kwargs)
+        self.latencies.append(time.monotonic() - started)
+        return result
+
+    def _hedged_call(self, input, config, **kwargs):
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._call(input, config, **kwargs)
+        # Copy the context so token usage is still attributed to the current span
+        primary = _hedge_executor.submit(copy_context().run, self._call, input, config, **kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        record("hedges")
+        _count("hedges")
+        hedge = _hedge_executor.submit(copy_context().run, self._call, input, config, **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        _count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def invoke(self, input, config=None, **kwargs):
+        _count("calls")
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._hedged_call(input, config, **kwargs)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    _count("failures")
+                    raise
+                self._backoff(attempt)
+
+    def stream(self, input, config=None, **kwargs):
+        _count("calls")
+        for attempt in range(self.max_retries + 1):
+            self._throttle()
+            started = False
+            try:
+                for chunk in self.llm.stream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Chunks already shown can't be taken back, so only retry before the first one
+                if started or attempt == self.max_retries or not is_retryable(e):
+                    _count("failures")
+                    raise
+                self._backoff(attempt)
+
+
+def make_resilient(llm, config, provider: str, max_retries: int = None):
+    """Wrap a chat model with the rate limiting, retry and hedging settings in the configuration."""
+    rate = config.get("llm_requests_per_second", {}).get(provider)
+    return ResilientChatModel(
+        llm,
+        rate_limiter=get_rate_limiter(provider, rate, config.get("llm_burst")) if rate else None,
+        max_retries=config.get("llm_max_retries", 3) if max_retries is None else max_retries,
+        base_delay=config.get("llm_retry_base_delay", 0.5),
+        max_delay=config.get("llm_retry_max_delay", 8.0),
+        hedge=config.get("llm_hedge_enabled", False),
+        hedge_percentile=config.get("llm_hedge_percentile", 0.95),
+        hedge_min_samples=config.get("llm_hedge_min_samples", 10)
+    )
@@ -0,0 +1,208 @@
+import json
+import math
+import re
+from collections import Counter
+from typing import Iterable, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from llm_components.memory import estimate_tokens
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|mc_cid|mc_eid|ref|ref_src|igshid)$")
+
+# Snippets that describe the page chrome rather than its content
+BOILERPLATE_PATTERN = re.compile(
+    r"enable javascript|javascript is disabled|accept (all )?cookies|we use cookies|"
+    r"sign in to continue|subscribe to (read|continue)|access denied|page not found",
+    re.IGNORECASE
+)
+
+# Analyses that say the results fall short, which a high term overlap can hide
+INSUFFICIENT_PATTERN = re.compile(
+    r"insufficient|not enough information|no relevant|irrelevant|could not find|does not (answer|address|contain)",
+    re.IGNORECASE
+)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which who why with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so the same page found through different links compares equal."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    query = urlencode(sorted((key, value) for key, value in parse_qsl(parts.query) if not TRACKING_PARAMS.match(key)))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("", host, path, query, ""))
+
+
+def shingles(text: str, size: int = 3) -> set:
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def bm25_scores(query: str, documents: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Okapi BM25 score of each document for the query, with IDF taken over the documents themselves."""
+    query_terms = set(tokenize(query))
+    tokenized = [tokenize(document) for document in documents]
+    if not query_terms or not tokenized:
+        return [0.0] * len(documents)
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens) & query_terms)
+    idf = {
+        term: math.log(1 + (len(tokenized) - frequency + 0.5) / (frequency + 0.5))
+        for term, frequency in document_frequency.items()
+    }
+    scores = []
+    for tokens in tokenized:
+        term_counts = Counter(tokens)
+        score = 0.0
+        for term, term_idf in idf.items():
+            count = term_counts[term]
+            if count:
+                score += term_idf * count * (k1 + 1) / (count + k1 * (1 - b + b * len(tokens) / average_length))
+        scores.append(score)
+    return scores
+
+
+def parse_results(batch: str, max_snippet_chars: int = 300) -> tuple:
+    """Parse a JSON result batch into compact title/link/snippet records and error messages."""
+    try:
+        items = json.loads(batch)
+    except (TypeError, ValueError):
+        return [], ["Search error: unreadable results"]
+    records, errors = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if "error" in item:
+            errors.append(item["error"])
+            continue
+        snippet = " ".join(item.get("snippet", "").split())
+        if len(snippet) > max_snippet_chars:
+            snippet = snippet[:max_snippet_chars].rsplit(" ", 1)[0] + "..."
+        record = {
+            "title": " ".join(item.get("title", "").split()),
+            "link": item.get("link", ""),
+            "snippet": snippet
+        }
+        # Passages from the fetched page, see page_fetch.enrich_results()
+        if item.get("content"):
+            record["content"] = item["content"]
+        records.append(record)
+    return records, errors
+
+
+def previous_records(batches: Iterable[str]) -> List[dict]:
+    records = []
+    for batch in batches:
+        records.extend(parse_results(batch)[0])
+    return records
+
+
+def compact_results(batch: str, question: str, previous_batches: Iterable[str] = (), token_budget: int = 800,
+                    top_k: int = 8, near_duplicate_threshold: float = 0.8) -> str:
+    """Deduplicate, rank and trim a result batch before it is shown to the LLM.
+
+    Results already returned by an earlier search, boilerplate snippets and
+    near-duplicate snippets are dropped. The rest are ranked with BM25
+    against the question and kept best-first up to `top_k` results and
+    roughly `token_budget` tokens.
+    """
+    records, errors = parse_results(batch)
+    earlier = previous_records(previous_batches)
+    known_urls = {canonical_url(record["link"]) for record in earlier if record["link"]}
+    known_shingles = [shingles(f"{record['title']} {record['snippet']}") for record in earlier]
+    kept = []
+    for record in records:
+        url = canonical_url(record["link"]) if record["link"] else ""
+        if url and url in known_urls:
+            continue
+        if not record["snippet"] or BOILERPLATE_PATTERN.search(record["snippet"]):
+            continue
+        record_shingles = shingles(f"{record['title']} {record['snippet']}")
+        if any(jaccard(record_shingles, other) >= near_duplicate_threshold for other in known_shingles):
+            continue
+        known_urls.add(url)
+        known_shingles.append(record_shingles)
+        kept.append(record)
+
+    if not kept:
+        if records:
+            return json.dumps([{"error": "No new results: all results duplicate earlier searches or have no usable snippet"}])
+        return json.dumps([{"error": errors[0] if errors else "No results found"}])
+
+    scores = bm25_scores(question, [f"{record['title']} {record['snippet']}" for record in kept])
+    # Stable sort keeps the search engine's order among equal scores
+    ranked = [kept[i] for i in sorted(range(len(kept)), key=lambda i: -scores[i])]
+    selected, used_tokens = [], 0
+    for record in ranked[:top_k]:
+        record_tokens = estimate_tokens(json.dumps(record))
+        if selected and used_tokens + record_tokens > token_budget:
+            break
+        selected.append(record)
+        used_tokens += record_tokens
+    return json.dumps(selected)
+
+
+def format_results(batches: Iterable[str]) -> str:
+    """Render result batches as numbered plain-text entries for prompts and the console."""
+    lines, number = [], 0
+    for batch in batches:
+        records, errors = parse_results(batch, max_snippet_chars=10_000)
+        for record in records:
+            number += 1
+            lines.append(f"[{number}] {record['title']} ({record['link']})\n{record['snippet']}")
+            if record.get("content"):
+                lines.append(f"Page excerpts:\n{record['content']}")
+        lines.extend(f"({error})" for error in errors)
+    return "\n\n".join(lines) if lines else "No results."
+
+
+def search_failed(batches: Iterable[str]) -> bool:
+    """Whether there are result batches and every entry in them is an error."""
+    parsed = [parse_results(batch) for batch in batches]
+    return bool(parsed) and not any(records for records, _ in parsed)
+
+
+def sufficiency_score(question: str, batches: Iterable[str], target_results: int = 5) -> float:
+    """Rate from 0 to 1 how well search results cover a question.
+
+    The share of question terms found anywhere in the results is scaled
+    down when there are fewer than `target_results` results and by the
+    share of entries that are errors.
+    """
+    records, errors = [], []
+    for batch in batches:
+        batch_records, batch_errors = parse_results(batch, max_snippet_chars=10_000)
+        records.extend(batch_records)
+        errors.extend(batch_errors)
+    if not records:
+        return 0.0
+    terms = set(tokenize(question))
+    found = set()
+    for record in records:
+        found.update(tokenize(f"{record['title']} {record['snippet']} {record.get('content', '')}"))
+    coverage = len(terms & found) / len(terms) if terms else 1.0
+    volume = min(1.0, len(records) / target_results)
+    error_ratio = len(errors) / (len(errors) + len(records))
+    return coverage * volume * (1 - error_ratio)
@@ -0,0 +1,115 @@
+import json
+import os
+import re
+import threading
+import zlib
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingVectorizer:
+    """Stateless text vectorizer using signed feature hashing of words and word pairs."""
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+
+    def transform(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            # crc32 is stable across processes, unlike the built-in hash()
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        # Sublinear term frequency, so repeated words don't dominate
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class RetrievalIndex:
+    """In-process similarity index over past turns, search results and analyses.
+
+    Documents are appended to a JSONL file as they are added, and their
+    vectors are recomputed when the index is loaded in a later session.
+    """
+
+    def __init__(self, path: str = "retrieval_index.jsonl", dim: int = 4096):
+        self.path = path
+        self.vectorizer = HashingVectorizer(dim)
+        self.documents = []
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self._append(json.loads(line))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _append(self, document: dict):
+        if len(self.documents) == len(self._vectors):
+            grown = np.zeros((len(self._vectors) * 2, self._vectors.shape[1]), dtype=np.float32)
+            grown[:len(self._vectors)] = self._vectors
+            self._vectors = grown
+        self._vectors[len(self.documents)] = self.vectorizer.transform(document["text"])
+        self.documents.append(document)
+
+    def add(self, text: str, kind: str, max_chars: int = 1000):
+        """Add a document, split into chunks of at most max_chars, and persist it."""
+        text = text.strip()
+        if not text:
+            return
+        chunks = [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+        with self._lock:
+            new_documents = [{"kind": kind, "text": chunk} for chunk in chunks]
+            for document in new_documents:
+                self._append(document)
+            if self.path:
+                with open(self.path, "a") as f:
+                    for document in new_documents:
+                        f.write(json.dumps(document) + "\n")
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.1) -> list:
+        """Return up to k documents most similar to the query, best first."""
+        with self._lock:
+            count = len(self.documents)
+            if count == 0:
+                return []
+            scores = self._vectors[:count] @ self.vectorizer.transform(query)
+            top = np.argsort(-scores)[:k] if count <= k else np.argpartition(-scores, k)[:k]
+            top = sorted(top, key=lambda i: -scores[i])
+            return [
+                {**self.documents[i], "score": float(scores[i])}
+                for i in top
+                if scores[i] >= min_score
+            ]
+
+    def add_turn(self, question: str, answer: str, analysis: str = "", search_results=()):
+        """Index a finished turn: the exchange itself, its analysis and its search results."""
+        self.add(f"User: {question}\nAssistant: {answer}", "turn")
+        if analysis:
+            self.add(analysis, "analysis")
+        for batch in search_results:
+            try:
+                items = json.loads(batch)
+            except (TypeError, ValueError):
+                continue
+            for item in items:
+                if isinstance(item, dict) and item.get("snippet"):
+                    self.add(f"{item.get('title', '')}: {item['snippet']} ({item.get('link', '')})", "search_result")
+
+    def render_context(self, query: str, k: int = 5, exclude: str = "") -> str:
+        """Render the top-k documents relevant to the query, skipping text already in `exclude`."""
+        documents = [document for document in self.search(query, k) if document["text"] not in exclude]
+        if not documents:
+            return ""
+        return "Relevant context from earlier turns and searches:\n" + "\n".join(
+            f"- ({document['kind']}) {document['text']}" for document in documents
+        )
@@ -0,0 +1,33 @@
+import json
+from llm_components.sqlite_cache import SQLiteCache
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and collapse its whitespace."""
+    return " ".join(query.lower().split())
+
+
+class SearchCache(SQLiteCache):
+    """SQLite-backed cache for search results with per-entry TTL and LRU eviction."""
+
+    table = "search_cache"
+
+    def __init__(self, path: str = "search_cache.db", ttl: float = 3600, max_entries: int = 1000):
+        super().__init__(path, ttl, max_entries)
+
+    @staticmethod
+    def make_key(query: str, engines) -> str:
+        return json.dumps([normalize_query(query), sorted(engines or [])])
+
+    def get(self, query: str, engines):
+        """Return the cached value for a query, or None if missing or expired."""
+        entry, _ = self._read(self.make_key(query, engines))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, query: str, engines, value: str, ttl: float = None):
+        """Store a value and evict the least recently used entries over the size limit."""
+        self._write(self.make_key(query, engines), {"value": value}, ttl)
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List
+
+
+class EngineHealth:
+    """Rolling latency and error record of one search engine.
+
+    An engine whose error rate over the window reaches the threshold is
+    skipped for `cooldown` seconds. After that it gets one probe request:
+    success clears its record, failure starts another cooldown.
+    """
+
+    def __init__(self, window: int = 20):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.cut_short = 0
+        self.skips = 0
+        self.skipped_until = 0.0
+        self.probing = False
+
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class SearchOrchestrator:
+    """Query search engines independently and concurrently, returning the first good results.
+
+    Each engine gets its own request. Results are returned as soon as
+    `min_results` distinct links have arrived, or when `deadline` expires
+    with whatever arrived by then; slower requests are cancelled. Engines
+    that error or miss the deadline too often are skipped for a while, and
+    results are ordered by engine health so faster, more reliable engines
+    come first.
+    """
+
+    def __init__(self, engines: List[str], min_results: int = 5, deadline: float = 3.0, error_threshold: float = 0.5,
+                 min_samples: int = 4, cooldown: float = 60.0, window: int = 20):
+        self.engines = list(engines)
+        self.min_results = min_results
+        self.deadline = deadline
+        self.error_threshold = error_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.health = {engine: EngineHealth(window) for engine in self.engines}
+        self._lock = threading.Lock()
+
+    def _record(self, engine: str, latency: float, ok: bool = None):
+        """Record a request outcome. `ok` is None for requests cut short once enough results arrived."""
+        health = self.health[engine]
+        with self._lock:
+            health.requests += 1
+            if ok is None:
+                health.cut_short += 1
+                return
+            health.latencies.append(latency)
+            if health.probing:
+                health.probing = False
+                if ok:
+                    health.outcomes.clear()
+                else:
+                    health.failures += 1
+                    health.skipped_until = time.monotonic() + self.cooldown
+                    return
+            health.outcomes.append(ok)
+            if not ok:
+                health.failures += 1
+                if len(health.outcomes) >= self.min_samples and health.error_rate() >= self.error_threshold:
+                    health.skipped_until = time.monotonic() + self.cooldown
+
+    def ranked_engines(self) -> List[str]:
+        """Engines to query, most reliable and fastest first. Engines cooling down are left out."""
+        now = time.monotonic()
+        active = []
+        with self._lock:
+            for engine in self.engines:
+                health = self.health[engine]
+                if health.skipped_until > now:
+                    health.skips += 1
+                    continue
+                if health.skipped_until:
+                    health.skipped_until = 0.0
+                    health.probing = True
+                active.append(engine)
+            # Never skip every engine: query them all rather than return nothing
+            if not active:
+                active = list(self.engines)
+            return sorted(active, key=lambda engine: (self.health[engine].error_rate(), self.health[engine].latency(0.5)))
+
+    async def search(self, query: str, fetch: Callable[[str, str], Awaitable[List[Dict]]], num_results: int = 5) -> List[Dict]:
+        """Run `fetch(query, engine)` for each active engine and merge the results that arrive in time.
+
+        Raises ValueError when no engine returned results before the deadline.
+        """
+        engines = self.ranked_engines()
+        started = time.monotonic()
+
+        async def timed(engine):
+            try:
+                return await fetch(query, engine)
+            finally:
+                latencies[engine] = time.monotonic() - started
+
+        latencies = {}
+        tasks = {asyncio.ensure_future(timed(engine)): engine for engine in engines}
+        results, errors, links = {}, [], set()
+        pending = set(tasks)
+        try:
+            while pending and len(links) < self.min_results:
+                remaining = self.deadline - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    engine = tasks[task]
+                    error = task.exception()
+                    if error is None and task.result():
+                        results[engine] = task.result()
+                        links.update(item["link"] for item in results[engine])
+                        self._record(engine, latencies[engine], True)
+                    else:
+                        errors.append(f"{engine}: {error or 'no results'}")
+                        self._record(engine, latencies[engine], False)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # Engines that missed the deadline count against their health; ones cut short by enough results do not
+        elapsed = time.monotonic() - started
+        for task in pending:
+            if len(links) < self.min_results:
+                self._record(tasks[task], elapsed, False)
+                errors.append(f"{tasks[task]}: no answer within {self.deadline}s")
+            else:
+                self._record(tasks[task], elapsed)
+
+        merged, seen_links = [], set()
+        for engine in engines:
+            for item in results.get(engine, []):
+                if item["link"] not in seen_links:
+                    seen_links.add(item["link"])
+                    merged.append(item)
+        if not merged:
+            raise ValueError("; ".join(errors) or "No engines available")
+        return merged[:num_results]
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-engine request, failure and latency stats over the rolling window."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                engine: {
+                    "requests": health.requests,
+                    "failures": health.failures,
+                    "cut_short": health.cut_short,
+                    "skips": health.skips,
+                    "error_rate": health.error_rate(),
+                    "p50_ms": health.latency(0.5) * 1000,
+                    "p95_ms": health.latency(0.95) * 1000,
+                    "skipped": health.skipped_until > now
+                }
+                for engine, health in self.health.items()
+            }
@@ -1,52 +1,248 @@
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_community.utilities import SearxSearchWrapper
 from pydantic import BaseModel, Field
-from typing import TypedDict, Annotated, Sequence, List, Dict, Any
+from typing import TypedDict, Annotated, Sequence, List, Dict, Any, Optional
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 import asyncio
 import json
+from itertools import zip_longest
+from llm_components.async_runtime import get_http_session, run_sync
+from llm_components.resilient_llm import make_resilient
+from llm_components.search_cache import SearchCache
+from llm_components.search_orchestrator import SearchOrchestrator
+from llm_components.tracing import record, span
 
 
-# Initialize LLM
-def get_llm(config):
-    if config["llm_provider"] == "openai":
+def model_spec(config, spec=None) -> dict:
+    """Resolve a model name or {"provider", "model"} dict, defaulting to the configured model."""
+    if spec is None:
+        spec = config["model"]
+    if isinstance(spec, str):
+        spec = {"model": spec}
+    return {"provider": spec.get("provider", config["llm_provider"]), "model": spec["model"]}
+
+def node_model_spec(config, node: str = None) -> dict:
+    """The model a graph node runs on, from the `node_models` map."""
+    return model_spec(config, config.get("node_models", {}).get(node))
+
+# Initialize LLM. Only the configured provider's SDK is imported.
+def build_chat_model(config, provider: str, model: str, timeout: float = None, max_retries: int = 2):
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             openai_api_key=config["openai_api_key"],
-            model=config["model"]
+            model=model,
+            timeout=timeout,
+            max_retries=max_retries
+        )
+    elif config.get("anthropic_prompt_caching", True):
+        from llm_components.prompt_caching import PromptCachingChatAnthropic
+        return PromptCachingChatAnthropic(
+            anthropic_api_key=config["anthropic_api_key"],
+            model=model,
+            timeout=timeout,
+            max_retries=max_retries
         )
     else:  # anthropic
+        from langchain_anthropic import ChatAnthropic
         return ChatAnthropic(
             anthropic_api_key=config["anthropic_api_key"],
-            model=config["model"]
+            model=model,
+            timeout=timeout,
+            max_retries=max_retries
         )
 
-# Set up the SearxNG wrapper
+def get_llm(config, node: str = None):
+    """Build the chat model for a graph node, falling back along `model_fallbacks` when it errors or times out."""
+    primary = node_model_spec(config, node)
+    fallbacks = [spec for spec in (model_spec(config, spec) for spec in config.get("model_fallbacks", [])) if spec != primary]
+    timeout = config.get("llm_timeout")
+    resilient = config.get("llm_resilience_enabled", True)
+
+    def build(spec, max_retries=None):
+        if resilient:
+            # Retries are handled by the wrapper, with rate limiting and jitter
+            return make_resilient(build_chat_model(config, **spec, timeout=timeout, max_retries=0), config, spec["provider"], max_retries=max_retries)
+        return build_chat_model(config, **spec, timeout=timeout, max_retries=2 if max_retries is None else max_retries)
+
+    # With fallbacks configured, hand over after one retry instead of retrying a struggling model
+    llm = build(primary, max_retries=1 if fallbacks else None)
+    if fallbacks:
+        llm = llm.with_fallbacks([build(spec) for spec in fallbacks])
+    return llm
+
+def get_node_llms(config, nodes: List[str]) -> Dict[str, Any]:
+    """Build the chat model of each node, sharing one client between nodes on the same model."""
+    clients, node_llms = {}, {}
+    for node in nodes:
+        key = json.dumps(node_model_spec(config, node), sort_keys=True)
+        if key not in clients:
+            clients[key] = get_llm(config, node=node)
+        node_llms[node] = clients[key]
+    return node_llms
+
+def format_token_usage(response) -> str:
+    """Describe the token usage reported on an LLM response message."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return "token usage unavailable"
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+    cached_note = f" ({cached} cached)" if cached else ""
+    return f"{usage.get('input_tokens', 0)} in{cached_note} / {usage.get('output_tokens', 0)} out tokens"
+
+# SearxNG settings. The wrapper is built on first use by get_searx_wrapper().
 searx_host = "http://localhost:8080"
-searx_wrapper = SearxSearchWrapper(
-    searx_host=searx_host,
-    engines=["google", "bing", "duckduckgo"]
-)
+search_engines = ["google", "bing", "duckduckgo"]
+searx_wrapper = None
+
+# Queries each engine separately when `search_per_engine` is set, see configure_searx()
+search_orchestrator = None
+
+def configure_searx(config):
+    """Point searches at the SearxNG instance and engines named in the configuration."""
+    global searx_host, search_engines, searx_wrapper, search_orchestrator
+    searx_host = config.get("searxng_host", "http://localhost:8080")
+    search_engines = config.get("search_engines", ["google", "bing", "duckduckgo"])
+    searx_wrapper = None
+    if config.get("search_per_engine", False):
+        search_orchestrator = SearchOrchestrator(
+            search_engines,
+            min_results=config.get("search_min_results", 5),
+            deadline=config.get("search_deadline", 3.0),
+            error_threshold=config.get("search_engine_error_threshold", 0.5),
+            min_samples=config.get("search_engine_min_samples", 4),
+            cooldown=config.get("search_engine_cooldown", 60),
+            window=config.get("search_engine_window", 20)
+        )
+    else:
+        search_orchestrator = None
+    return search_orchestrator
+
+def get_searx_wrapper():
+    global searx_wrapper
+    if searx_wrapper is None:
+        from langchain_community.utilities import SearxSearchWrapper
+        searx_wrapper = SearxSearchWrapper(
+            searx_host=searx_host,
+            engines=search_engines
+        )
+    return searx_wrapper
+
+# Search result cache, set up by configure_search_cache()
+search_cache = None
+
+def configure_search_cache(config):
+    """Set up the on-disk search result cache from the agent configuration."""
+    global search_cache
+    if config.get("search_cache_enabled", True):
+        search_cache = SearchCache(
+            path=config.get("search_cache_path", "search_cache.db"),
+            ttl=config.get("search_cache_ttl", 3600),
+            max_entries=config.get("search_cache_max_entries", 1000)
+        )
+    else:
+        search_cache = None
+    return search_cache
 
 # Define SearchInput model
 class SearchInput(BaseModel):
     query: str = Field(..., description="The search query string")
 
+# Define ResearchStep model, the structured output of the combined analyze/decide step
+class ResearchStep(BaseModel):
+    """Analysis of the search results and the decision on what to do next."""
+    analysis: str = Field(..., description="Concise summary of the key points in the search results, including any errors, inconsistencies or gaps")
+    sufficient: bool = Field(..., description="True if the information is sufficient to answer the user's question accurately")
+    next_search: Optional[SearchInput] = Field(None, description="The next web search to run, only when the information is not sufficient")
+
+async def searx_results(query: str, num_results: int = 5, engines: List[str] = None) -> List[Dict]:
+    """Query SearxNG through the pooled HTTP session, in the same format as searx_wrapper.aresults."""
+    session = await get_http_session()
+    wrapper = get_searx_wrapper()
+    params = {**wrapper.params, "q": query}
+    if engines:
+        params["engines"] = ",".join(engines)
+    async with session.get(wrapper.searx_host, headers=wrapper.headers, params=params) as response:
+        if not response.ok:
+            raise ValueError(f"Searx API returned an error: {response.status}")
+        data = await response.json(content_type=None)
+    # SearxNG answers 200 even when its upstream engines fail, listing them as unresponsive
+    unresponsive = data.get("unresponsive_engines") or []
+    if unresponsive and not data.get("results"):
+        raise ValueError("Unresponsive engines: " + ", ".join(f"{engine} ({reason})" for engine, reason in unresponsive))
+    return [
+        {
+            "snippet": result.get("content", ""),
+            "title": result["title"],
+            "link": result["url"],
+            "engines": result["engines"],
+            "category": result["category"],
+        }
+        for result in data.get("results", [])[:num_results]
+    ]
+
 # Define structured search function
-async def structured_search(query: str) -> str:
+async def structured_search(query: str, timeout: float = None) -> str:
     """Perform a web search with a query string."""
-    try:
-        result = await searx_wrapper.aresults(query, num_results=5)
-        if result:
-            return json.dumps(result)
-        else:
-            return json.dumps([{"error": "No results found"}])
-    except Exception as e:
-        return json.dumps([{"error": f"Search error: {str(e)}"}])
-
-# Create a synchronous wrapper for the asynchronous search function
-def sync_structured_search(query: str) -> str:
-    return asyncio.run(structured_search(query))
+    with span("structured_search", query=query):
+        if search_cache is not None:
+            cached = search_cache.get(query, search_engines)
+            if cached is not None:
+                record("cache_hits")
+                return cached
+        try:
+            if search_orchestrator is not None:
+                search = search_orchestrator.search(query, lambda query, engine: searx_results(query, num_results=5, engines=[engine]))
+            else:
+                search = searx_results(query, num_results=5)
+            result = await asyncio.wait_for(search, timeout)
+            if result:
+                result_json = json.dumps(result)
+                if search_cache is not None:
+                    search_cache.set(query, search_engines, result_json)
+                return result_json
+            else:
+                return json.dumps([{"error": "No results found"}])
+        except asyncio.TimeoutError:
+            return json.dumps([{"error": f"Search error: timed out after {timeout}s"}])
+        except Exception as e:
+            return json.dumps([{"error": f"Search error: {str(e)}"}])
+
+def merge_search_results(batches: List[str]) -> str:
+    """Merge JSON result batches, interleaving them and dropping duplicate links."""
+    parsed = [json.loads(batch) for batch in batches]
+    merged, errors, seen_links = [], [], set()
+    for round_items in zip_longest(*parsed):
+        for item in round_items:
+            if item is None:
+                continue
+            if "error" in item:
+                errors.append(item)
+                continue
+            link = item.get("link")
+            if link in seen_links:
+                continue
+            seen_links.add(link)
+            merged.append(item)
+    if merged:
+        return json.dumps(merged)
+    return json.dumps(errors[:1] or [{"error": "No results found"}])
+
+async def multi_structured_search(queries: List[str], max_concurrency: int = 3, timeout: float = 10.0) -> str:
+    """Run several search queries concurrently and merge their results."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded_search(query):
+        async with semaphore:
+            return await structured_search(query, timeout=timeout)
+
+    batches = await asyncio.gather(*(bounded_search(query) for query in queries))
+    return merge_search_results(batches)
+
+# Synchronous wrappers that run the searches on the shared event loop
+def sync_structured_search(query: str, timeout: float = None) -> str:
+    return run_sync(structured_search(query, timeout=timeout))
+
+def sync_multi_structured_search(queries: List[str], max_concurrency: int = 3, timeout: float = 10.0) -> str:
+    return run_sync(multi_structured_search(queries, max_concurrency=max_concurrency, timeout=timeout))
 
 # Define AgentState
 class AgentState(TypedDict):
@@ -56,4 +252,8 @@ class AgentState(TypedDict):
     search_count: Annotated[int, "The number of searches performed"]
     decision: Annotated[str, "The decision to search or respond"]
     search_query: Annotated[str, "The query for the next search"]
-    memory: Annotated[Dict[str, Any], "The memory of past interactions"]
\ No newline at end of file
+    searched_queries: Annotated[List[str], "The queries this turn's search rounds were asked for"]
+    conversation_history: Annotated[str, "The rendered conversation history, built once per turn"]
+    streamed: Annotated[bool, "Whether the final response was already streamed to the console"]
+    usage: Annotated[Dict[str, Any], "Wall time, LLM calls and tokens spent on the turn so far"]
+    budget_binding: Annotated[str, "The turn budget that forced the response, if any"]
\ No newline at end of file
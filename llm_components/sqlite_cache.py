@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+import time
+
+
+class SQLiteCache:
+    """SQLite table of keyed entries with per-entry TTL and LRU eviction.
+
+    Subclasses name the table, its key column and value columns; expiry,
+    least-recently-used eviction and the entry count are handled here.
+    """
+
+    table = "cache"
+    key_column = "key"
+    columns = ("value TEXT NOT NULL",)
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.fields = [column.split()[0] for column in self.columns]
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                {self.key_column} TEXT PRIMARY KEY,
+                {", ".join(self.columns)},
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table} (last_access)")
+        self._conn.commit()
+
+    def _read(self, key: str, keep_expired: bool = False):
+        """Return (entry, fresh) for a key, or (None, False) if missing.
+
+        Expired entries are deleted and reported missing unless `keep_expired` is set.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.fields)}, expires_at FROM {self.table} WHERE {self.key_column} = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, False
+            fresh = row[-1] > now
+            if not fresh and not keep_expired:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE {self.key_column} = ?", (key,))
+                self._conn.commit()
+                return None, False
+            self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE {self.key_column} = ?", (now, key))
+            self._conn.commit()
+        return dict(zip(self.fields, row)), fresh
+
+    def _write(self, key: str, entry: dict, ttl: float = None, keep_expired: bool = False):
+        """Store an entry and evict the least recently used entries over the size limit."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        names = [self.key_column, *self.fields, "expires_at", "last_access"]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                (key, *(entry.get(field) for field in self.fields), expires_at, now)
+            )
+            if not keep_expired:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                f"""DELETE FROM {self.table} WHERE {self.key_column} IN (
+                    SELECT {self.key_column} FROM {self.table} ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def entries(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.entries()
+        }
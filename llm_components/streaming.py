@@ -0,0 +1,86 @@
+from rich.markdown import Markdown
+from rich.panel import Panel
+
+
+RESPONSE_OPEN_TAG = "<response>"
+RESPONSE_CLOSE_TAG = "</response>"
+ANSWER_PREFIX = "ANSWER:"
+
+
+def chunk_text(chunk) -> str:
+    """Return the text of a streamed message chunk, whatever the provider's content format."""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def response_panel(text: str, title: str) -> Panel:
+    """Build the panel used to display the assistant's final response."""
+    return Panel(
+        Markdown(text),
+        title=title,
+        expand=False,
+        border_style="cyan",
+        padding=(1, 1),
+        style="on black"
+    )
+
+
+def _strip_partial_tag(text: str, tag: str) -> str:
+    """Drop a trailing fragment of `tag` that may be completed by the next chunk."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return text[:-length]
+    return text
+
+
+class ResponseTagStream:
+    """Incrementally extract the text between <response> tags from a token stream."""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text: str) -> str:
+        self.buffer += text
+        return self.visible_text()
+
+    def visible_text(self) -> str:
+        """Text that can be shown so far, without tags or half-received tags."""
+        start = self.buffer.find(RESPONSE_OPEN_TAG)
+        if start == -1:
+            return _strip_partial_tag(self.buffer, RESPONSE_OPEN_TAG).strip()
+        body = self.buffer[start + len(RESPONSE_OPEN_TAG):]
+        end = body.find(RESPONSE_CLOSE_TAG)
+        if end != -1:
+            return body[:end].strip()
+        return _strip_partial_tag(body, RESPONSE_CLOSE_TAG).strip()
+
+
+class AnswerPrefixStream:
+    """Incrementally detect an 'ANSWER:' prefix in a token stream.
+
+    `is_answer` stays None until enough text has arrived to decide.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.is_answer = None
+
+    def feed(self, text: str) -> str:
+        self.buffer += text
+        if self.is_answer is None:
+            stripped = self.buffer.lstrip()
+            if stripped.startswith(ANSWER_PREFIX):
+                self.is_answer = True
+            elif stripped and not ANSWER_PREFIX.startswith(stripped):
+                self.is_answer = False
+        return self.answer_text()
+
+    def answer_text(self) -> str:
+        if not self.is_answer:
+            return ""
+        return self.buffer.lstrip()[len(ANSWER_PREFIX):].strip()
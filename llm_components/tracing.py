@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# Span the current code runs in, if any
+_current_span = ContextVar("current_span", default=None)
+
+COUNTERS = ["llm_calls", "prompt_tokens", "cached_prompt_tokens", "completion_tokens", "retries", "hedges", "cache_hits", "speculative_searches", "speculation_hits",
+            "sufficiency_skips", "sufficiency_checks", "sufficiency_agreements"]
+
+
+class Span:
+    def __init__(self, name: str, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def to_record(self) -> dict:
+        return {
+            "ts": time.time(),
+            "span": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "duration_ms": round(self.duration * 1000, 2),
+            **self.counters,
+            "error": self.error,
+            **self.attributes
+        }
+
+
+class Tracer:
+    """Records timed spans with token, retry, hedge and cache-hit counters.
+
+    Finished spans are written to a rotating JSONL file, when one is
+    configured, and kept in a rolling in-memory window for session stats.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = 5_000_000, backup_count: int = 3, window: int = 500):
+        self._lock = threading.Lock()
+        self._recent = {}
+        self.window = window
+        self._logger = None
+        if path:
+            self._logger = logging.getLogger(f"agent_trace.{id(self)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block of work. Counters recorded inside it are attributed to it."""
+        span = Span(name, parent=_current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span.started
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        span_record = span.to_record()
+        with self._lock:
+            self._recent.setdefault(span.name, deque(maxlen=self.window)).append(span_record)
+        if self._logger is not None:
+            self._logger.info(json.dumps(span_record, default=str))
+
+    def stats(self) -> dict:
+        """Rolling aggregates per span name over the recent window."""
+        with self._lock:
+            recent = {name: list(records) for name, records in self._recent.items()}
+        stats = {}
+        for name, records in recent.items():
+            durations = sorted(span_record["duration_ms"] for span_record in records)
+            stats[name] = {
+                "count": len(records),
+                "p50_ms": durations[len(durations) // 2],
+                "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "errors": sum(1 for span_record in records if span_record["error"]),
+                **{counter: sum(span_record[counter] for span_record in records) for counter in COUNTERS}
+            }
+        return stats
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """LangChain callback that adds LLM calls and token usage to the current span."""
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens = cached_prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    # Prompt tokens read from the provider's prompt cache, a subset of input_tokens
+                    cached_prompt_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens and not completion_tokens:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+        record("llm_calls")
+        record("prompt_tokens", prompt_tokens)
+        record("cached_prompt_tokens", cached_prompt_tokens)
+        record("completion_tokens", completion_tokens)
+
+    def on_llm_error(self, error, **kwargs):
+        # Includes streams closed early on purpose, which still cost a call
+        record("llm_calls")
+
+    def on_retry(self, retry_state, **kwargs):
+        record("retries")
+
+
+def record(counter: str, amount: int = 1):
+    """Add to a counter on the current span and its parents."""
+    span = _current_span.get()
+    while span is not None:
+        span.counters[counter] = span.counters.get(counter, 0) + amount
+        span = span.parent
+
+
+# Session-wide tracer, set up by configure_tracing()
+tracer = Tracer()
+token_usage_callback = TokenUsageCallback()
+
+
+def configure_tracing(config):
+    """Set up the session tracer from the agent configuration."""
+    global tracer
+    path = config.get("trace_path", "agent_trace.jsonl") if config.get("trace_enabled", True) else None
+    tracer = Tracer(
+        path=path,
+        max_bytes=config.get("trace_max_bytes", 5_000_000),
+        backup_count=config.get("trace_backup_count", 3)
+    )
+    return tracer
+
+
+def span(name: str, **attributes):
+    """Open a span on the session tracer."""
+    return tracer.span(name, **attributes)
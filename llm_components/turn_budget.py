@@ -0,0 +1,74 @@
+from typing import Optional
+
+
+# Budget names, in the order they are checked
+BUDGETS = ["searches", "deadline", "tokens", "llm_calls"]
+
+
+def empty_usage() -> dict:
+    """Usage of a turn that has not run any node yet."""
+    return {"seconds": 0.0, "llm_calls": 0, "tokens": 0}
+
+
+def add_usage(usage: dict, node_span) -> dict:
+    """Add the wall time, LLM calls and tokens recorded on a node's span to the turn's usage."""
+    counters = node_span.counters
+    return {
+        "seconds": usage["seconds"] + node_span.duration,
+        "llm_calls": usage["llm_calls"] + counters["llm_calls"],
+        "tokens": usage["tokens"] + counters["prompt_tokens"] + counters["completion_tokens"]
+    }
+
+
+class TurnGovernor:
+    """Per-turn budgets for wall time, tokens, LLM calls and search rounds.
+
+    The graph's conditional edges consult it before each further search
+    round. Another round plus the response are assumed to cost as much as
+    two average steps so far; when that would overrun a budget, or no
+    search rounds are left, the turn goes straight to a best-effort
+    response and that budget is recorded as the one that bound the turn.
+    Time is the sum of node run times, so a resumed turn is not charged
+    for the time it spent interrupted.
+    """
+
+    def __init__(self, deadline: float = None, max_tokens: int = None, max_llm_calls: int = None, max_searches: int = 5):
+        self.deadline = deadline
+        self.max_tokens = max_tokens
+        self.max_llm_calls = max_llm_calls
+        self.max_searches = max_searches
+
+    def binding_budget(self, state) -> Optional[str]:
+        """The budget another search round would exceed, or None if it fits."""
+        if state["search_count"] >= self.max_searches:
+            return "searches"
+        usage = state["usage"]
+        steps = state["search_count"] + 1
+        for budget, used, limit in (
+            ("deadline", usage["seconds"], self.deadline),
+            ("tokens", usage["tokens"], self.max_tokens),
+            ("llm_calls", usage["llm_calls"], self.max_llm_calls)
+        ):
+            if limit is not None and used + 2 * used / steps > limit:
+                return budget
+        return None
+
+    def route(self, state) -> str:
+        """Conditional edge: the node's decision, or 'respond' when another search round does not fit."""
+        if state["decision"] in ("search", "decide") and self.binding_budget(state):
+            return "respond"
+        return state["decision"]
+
+    def describe(self, state) -> str:
+        """A note on the budget that bound the turn, for showing with the answer."""
+        usage = state["usage"]
+        budget = state.get("budget_binding")
+        if budget == "searches":
+            return f"Answered at the limit of {self.max_searches} search rounds."
+        if budget == "deadline":
+            return f"Answered early to meet the {self.deadline:g}s turn deadline ({usage['seconds']:.1f}s used)."
+        if budget == "tokens":
+            return f"Answered early to stay within the {self.max_tokens} token budget ({usage['tokens']} used)."
+        if budget == "llm_calls":
+            return f"Answered early to stay within the {self.max_llm_calls} LLM call budget ({usage['llm_calls']} used)."
+        return ""
@@ -0,0 +1,244 @@
+"""Multi-session server exposing the agent graph over HTTP and WebSocket.
+
+One warm process serves many concurrent sessions. Each session has its own
+conversation memory and runs one turn at a time; the LLM client, search
+cache and HTTP connection pool are shared. Endpoints:
+
+    POST   /sessions/{session_id}/ask   {"question": ...} -> final answer as JSON
+    GET    /sessions/{session_id}/ws    WebSocket; send {"question": ...} and receive
+                                         node, token and answer events
+    DELETE /sessions/{session_id}       drop a session and its memory
+    GET    /stats                       rolling per-span aggregates
+
+Turns beyond the concurrency limit wait in a bounded queue; when the queue
+or a session's own limit is full, requests are rejected with 429. Run with
+--fake to serve from the benchmark fake model and a local SearxNG stand-in.
+"""
+import argparse
+import asyncio
+import time
+from aiohttp import web, WSMsgType
+from config_manager import load_config
+
+
+class TooBusy(Exception):
+    """Raised when a turn cannot be queued because a limit is reached."""
+
+
+class Session:
+    def __init__(self, session_id: str, memory):
+        self.id = session_id
+        self.memory = memory
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.turns = 0
+        self.last_active = time.monotonic()
+
+
+class AgentServer:
+    def __init__(self, agent, max_sessions: int = 100, max_concurrent_turns: int = 8,
+                 max_pending_turns: int = 32, max_pending_per_session: int = 2, turn_timeout: float = 180):
+        self.agent = agent
+        self.sessions = {}
+        self.max_sessions = max_sessions
+        self.max_pending_turns = max_pending_turns
+        self.max_pending_per_session = max_pending_per_session
+        self.turn_timeout = turn_timeout
+        self.pending = 0
+        self._turn_slots = asyncio.Semaphore(max_concurrent_turns)
+
+    def get_session(self, session_id: str) -> Session:
+        from llm_components.memory import ConversationMemory
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                idle = [s for s in self.sessions.values() if s.pending == 0]
+                if not idle:
+                    raise TooBusy("Too many active sessions")
+                del self.sessions[min(idle, key=lambda s: s.last_active).id]
+            memory = ConversationMemory(self.agent["llm"], token_budget=self.agent["config"].get("memory_token_budget", 2000))
+            session = self.sessions[session_id] = Session(session_id, memory)
+        session.last_active = time.monotonic()
+        return session
+
+    async def run_turn(self, session: Session, question: str, emit=None) -> dict:
+        """Answer a question in a session, sending node and token events to `emit` as they happen.
+
+        A turn that fails or times out leaves the session's memory as it was.
+        On timeout the turn's slot is released right away, but a graph node
+        already running in a worker thread finishes in the background, so
+        briefly more than `max_concurrent_turns` nodes may be executing.
+        """
+        if session.pending >= self.max_pending_per_session:
+            raise TooBusy(f"Session {session.id} already has {session.pending} turns queued")
+        if self.pending >= self.max_pending_turns:
+            raise TooBusy("Server turn queue is full")
+        session.pending += 1
+        self.pending += 1
+        try:
+            async with session.lock, self._turn_slots:
+                try:
+                    return await asyncio.wait_for(self._run_turn(session, question, emit), self.turn_timeout)
+                except (Exception, asyncio.CancelledError):
+                    # Drop the unanswered question so the next turn does not see it
+                    session.memory.discard_last("user")
+                    raise
+        finally:
+            session.pending -= 1
+            self.pending -= 1
+            session.last_active = time.monotonic()
+
+    async def _run_turn(self, session: Session, question: str, emit) -> dict:
+        from langgraph.errors import GraphRecursionError
+        from llm_components.agent_graph import initial_state
+        from llm_components.streaming import ResponseTagStream, chunk_text
+        from llm_components.tracing import span, token_usage_callback
+
+        async def send(event):
+            if emit is not None:
+                await emit(event)
+
+        started = time.perf_counter()
+        session.memory.add("user", question)
+        state = initial_state(question, session.memory.render())
+        recursion_limit = self.agent["config"].get("graph_recursion_limit", 25)
+        run_config = {"recursion_limit": recursion_limit, "callbacks": [token_usage_callback]}
+        parser = ResponseTagStream()
+        streamed_text = ""
+
+        with span("turn", session=session.id):
+            try:
+                async for mode, chunk in self.agent["graph"].astream(state, config=run_config, stream_mode=["updates", "messages"]):
+                    if mode == "updates":
+                        for node_name, node_state in chunk.items():
+                            state = {**state, **node_state}
+                            await send({"type": "node", "node": node_name, "decision": state["decision"], "search_count": state["search_count"]})
+                    else:
+                        message, metadata = chunk
+                        if metadata.get("langgraph_node") != "respond":
+                            continue
+                        visible = parser.feed(chunk_text(message))
+                        if visible.startswith(streamed_text) and len(visible) > len(streamed_text):
+                            await send({"type": "token", "text": visible[len(streamed_text):]})
+                            streamed_text = visible
+            except GraphRecursionError:
+                state = await asyncio.get_running_loop().run_in_executor(None, self.agent["respond"], state)
+
+        answer = state["messages"][-1].content
+        session.memory.add("assistant", answer)
+        session.turns += 1
+        result = {
+            "type": "answer",
+            "session_id": session.id,
+            "answer": answer,
+            "search_count": state["search_count"],
+            "budget_binding": state.get("budget_binding") or None,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        await send(result)
+        return result
+
+
+def create_app(server: AgentServer) -> web.Application:
+    async def ask(request):
+        try:
+            payload = await request.json()
+            question = payload["question"]
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "Expected a JSON body with a 'question' field"}, status=400)
+        try:
+            session = server.get_session(request.match_info["session_id"])
+            return web.json_response(await server.run_turn(session, question))
+        except TooBusy as e:
+            return web.json_response({"error": str(e)}, status=429)
+        except asyncio.TimeoutError:
+            return web.json_response({"error": "Turn timed out"}, status=504)
+
+    async def websocket(request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        session_id = request.match_info["session_id"]
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            try:
+                question = message.json()["question"]
+            except (ValueError, KeyError, TypeError):
+                await ws.send_json({"type": "error", "error": "Expected a JSON message with a 'question' field"})
+                continue
+            try:
+                session = server.get_session(session_id)
+                await server.run_turn(session, question, emit=ws.send_json)
+            except TooBusy as e:
+                await ws.send_json({"type": "error", "error": str(e), "retry": True})
+            except asyncio.TimeoutError:
+                await ws.send_json({"type": "error", "error": "Turn timed out"})
+            except Exception as e:
+                await ws.send_json({"type": "error", "error": f"{type(e).__name__}: {e}"})
+        return ws
+
+    async def delete_session(request):
+        server.sessions.pop(request.match_info["session_id"], None)
+        return web.json_response({"deleted": True})
+
+    async def stats(request):
+        return web.json_response({
+            "sessions": len(server.sessions),
+            "pending_turns": server.pending,
+            "spans": server.agent["tracer"].stats()
+        })
+
+    app = web.Application()
+    app.add_routes([
+        web.post("/sessions/{session_id}/ask", ask),
+        web.get("/sessions/{session_id}/ws", websocket),
+        web.delete("/sessions/{session_id}", delete_session),
+        web.get("/stats", stats),
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the agent to many concurrent sessions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-sessions", type=int, default=100, help="Sessions kept in memory; idle ones are evicted first.")
+    parser.add_argument("--max-concurrent-turns", type=int, default=8, help="Turns executing at once across all sessions.")
+    parser.add_argument("--max-pending-turns", type=int, default=32, help="Turns running or queued before new ones are rejected.")
+    parser.add_argument("--max-pending-per-session", type=int, default=2, help="Turns running or queued per session.")
+    parser.add_argument("--turn-timeout", type=float, default=180, help="Seconds before a turn is abandoned.")
+    parser.add_argument("--fake", action="store_true", help="Use the benchmark fake model and a local SearxNG stand-in.")
+    args = parser.parse_args()
+
+    from llm_components import graph_nodes
+    from llm_components.agent_graph import build_agent
+    graph_nodes.console.quiet = True
+
+    llm = None
+    if args.fake:
+        from benchmarks.fake_llm import FakeChatModel
+        from benchmarks.fake_searx import FakeSearxServer
+        searx = FakeSearxServer(port=0).start()
+        config = {"llm_provider": "fake", "model": "fake-agent-model", "searxng_host": searx.url, "search_cache_enabled": False}
+        llm = FakeChatModel()
+    else:
+        config = load_config()
+        if not config:
+            raise SystemExit("No config.json found. Run `python config_manager.py` first.")
+    # Tokens are streamed to clients, not rendered in the terminal, and there is no /resume to use checkpoints
+    config = {**config, "stream_responses": False, "checkpoint_enabled": False}
+
+    server = AgentServer(
+        build_agent(config, llm=llm),
+        max_sessions=args.max_sessions,
+        max_concurrent_turns=args.max_concurrent_turns,
+        max_pending_turns=args.max_pending_turns,
+        max_pending_per_session=args.max_pending_per_session,
+        turn_timeout=args.turn_timeout
+    )
+    web.run_app(create_app(server), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()